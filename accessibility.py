@@ -1,170 +1,391 @@
 # accessibility.py
+import logging
+import re
+from functools import lru_cache
+from string import Template
+
+import numpy as np
 import streamlit as st
-import plotly.graph_objects as go
+import plotly.io as pio
+from jinja2 import Environment, select_autoescape
 
-def add_accessibility_features():
-    """Přidá accessibility features do aplikace"""
-    
-    # Custom CSS pro lepší accessibility
-    st.markdown("""
-    <style>
-    /* Vylepšení kontrastů */
-    .metric-container {
-        border: 1px solid #ddd;
-        border-radius: 8px;
-        padding: 10px;
-        margin: 5px;
+from utils import lttb_indices
+
+logger = logging.getLogger(__name__)
+
+# Serializace grafů do JSON přes orjson (C implementace, rychlejší pro numpy pole)
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = "orjson"
+except ImportError:
+    pass
+
+# Jediná paleta barev – z ní se odvozuje CSS, metric cards i Plotly colorway
+_PALETTE = {
+    "text": "#1f2937",
+    "muted": "#6B7280",
+    "accent": "#059669",
+    "focus": "#4CAF50",
+    "border": "#ddd",
+    "dark_bg": "#374151",
+    # Lepší barvy pro colorblind uživatele
+    "series": ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b'),
+}
+
+# Custom CSS pro lepší accessibility (čitelný zdroj, barvy jako $placeholdery z _PALETTE)
+_RAW_CSS = """
+<style>
+/* Vylepšení kontrastů */
+.metric-container {
+    border: 1px solid $border;
+    border-radius: 8px;
+    padding: 10px;
+    margin: 5px;
+}
+
+/* Mřížka pro více metric cards najednou */
+.metric-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(160px, 1fr));
+    gap: 5px;
+}
+
+/* Lepší focus indikátory */
+button:focus, .stSelectbox > div > div:focus {
+    outline: 3px solid $focus !important;
+    outline-offset: 2px !important;
+}
+
+/* Vyšší kontrast pro texty */
+.stMarkdown p, .stMarkdown li {
+    color: $text !important;
+}
+
+/* Screen reader friendly */
+.sr-only {
+    position: absolute;
+    width: 1px;
+    height: 1px;
+    padding: 0;
+    margin: -1px;
+    overflow: hidden;
+    clip: rect(0, 0, 0, 0);
+    white-space: nowrap;
+    border: 0;
+}
+
+/* High contrast mode support */
+@media (prefers-contrast: high) {
+    .stApp {
+        background-color: white !important;
+        color: black !important;
     }
     
-    /* Lepší focus indikátory */
-    button:focus, .stSelectbox > div > div:focus {
-        outline: 3px solid #4CAF50 !important;
-        outline-offset: 2px !important;
+    .metric-container {
+        border: 2px solid black !important;
     }
-    
-    /* Vyšší kontrast pro texty */
-    .stMarkdown p, .stMarkdown li {
-        color: #1f2937 !important;
+}
+
+/* Reduced motion support */
+@media (prefers-reduced-motion: reduce) {
+    * {
+        animation-duration: 0.01ms !important;
+        animation-iteration-count: 1 !important;
+        transition-duration: 0.01ms !important;
     }
-    
-    /* Screen reader friendly */
-    .sr-only {
-        position: absolute;
-        width: 1px;
-        height: 1px;
-        padding: 0;
-        margin: -1px;
-        overflow: hidden;
-        clip: rect(0, 0, 0, 0);
-        white-space: nowrap;
-        border: 0;
+}
+
+/* Dark mode support */
+@media (prefers-color-scheme: dark) {
+    .metric-container {
+        background-color: $dark_bg;
+        border-color: $muted;
     }
+}
+</style>
+"""
+
+# Dosazení palety a minifikace jednou při importu – odstraní komentáře a sloučí
+# whitespace, takže se při každém rerunu posílá zhruba poloviční payload
+_CSS = Template(_RAW_CSS).substitute(_PALETTE)
+_CSS = re.sub(r"\s+", " ", re.sub(r"/\*.*?\*/", "", _CSS, flags=re.S)).strip()
+
+# Layout konstanty pro grafy – sdílené napříč voláními make_chart_accessible
+_COLORWAY = _PALETTE["series"]
+# Barvu titulku nenastavujeme – dědí ji z šablony grafu (kontrast i u tmavých šablon)
+_TITLE_FONT = {'size': 16}
+# Vizuální rozpočet bodů na jeden trace (nad ním downsampling přes LTTB)
+_MAX_POINTS = 2000
+# Od tohoto počtu bodů přepínáme scatter na WebGL (SVG nad ~1000 body výrazně zpomaluje)
+_WEBGL_MIN_POINTS = 1000
+# Plotly šablona s colorblind-friendly barvami a centrovaným titulkem
+_A11Y_TEMPLATE = "a11y"
+_CHART_DESC_TMPL = (
+    '<div class="chart-description" role="img" aria-label="{title}">'
+    '<span class="sr-only">Graf: {title}. {description}</span>'
+    '{data_summary}</div>'
+)
+
+# HTML escapování přes str.translate (C-level, bez Python smyčky přes znaky)
+_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+
+def _esc(s):
+    """Escapuje uživatelský text pro vložení do HTML"""
+    return str(s).translate(_ESCAPE)
+
+class A11yBuffer:
+    """Sbírá HTML fragmenty a vykreslí je jedním st.markdown voláním"""
     
-    /* High contrast mode support */
-    @media (prefers-contrast: high) {
-        .stApp {
-            background-color: white !important;
-            color: black !important;
-        }
-        
-        .metric-container {
-            border: 2px solid black !important;
-        }
-    }
+    def __init__(self):
+        self.parts = []
     
-    /* Reduced motion support */
-    @media (prefers-reduced-motion: reduce) {
-        * {
-            animation-duration: 0.01ms !important;
-            animation-iteration-count: 1 !important;
-            transition-duration: 0.01ms !important;
-        }
-    }
+    def add(self, fragment):
+        self.parts.append(fragment)
     
-    /* Dark mode support */
-    @media (prefers-color-scheme: dark) {
-        .metric-container {
-            background-color: #374151;
-            border-color: #6B7280;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    def flush(self):
+        if self.parts:
+            st.markdown("".join(self.parts), unsafe_allow_html=True)
+            self.parts.clear()
 
-def make_chart_accessible(fig, title, description, data_summary=""):
-    """Přidá accessibility features do plotly grafů"""
+def _session_buffer():
+    """Buffer je per-session – modulová globální by se sdílela mezi uživateli (vlákny serveru)"""
+    if "_a11y_buffer" not in st.session_state:
+        st.session_state["_a11y_buffer"] = A11yBuffer()
+    return st.session_state["_a11y_buffer"]
+
+def _emit(fragment, buffered):
+    """Vykreslí HTML hned, nebo ho odloží do session bufferu"""
+    if buffered:
+        _session_buffer().add(fragment)
+    else:
+        st.markdown(fragment, unsafe_allow_html=True)
+
+def flush_accessibility_buffer():
+    """Vykreslí všechny odložené accessibility fragmenty (volat na konci stránky;
+    buffer vyprazdňuje na začátku běhu add_accessibility_features)"""
+    _session_buffer().flush()
+
+# Šablona metric card – Jinja2 ji zkompiluje jednou do bytecode, autoescape escapuje vstupy
+_JINJA_ENV = Environment(autoescape=select_autoescape(default_for_string=True))
+_CARD_TPL = _JINJA_ENV.from_string(
+    '<div class="metric-container" role="region" aria-label="{{ label }}: {{ value }}'
+    '{% if delta %} ({{ delta }}){% endif %}">'
+    '<h3 style="margin:0;font-size:14px;color:' + _PALETTE["muted"] + ';">{{ label }}</h3>'
+    '<div style="font-size:24px;font-weight:bold;color:' + _PALETTE["text"] + ';" aria-live="polite">{{ value }}</div>'
+    '{% if delta %}<div style="font-size:12px;color:' + _PALETTE["accent"] + ';">{{ delta }}</div>{% endif %}'
+    '{% if help %}<div class="sr-only">{{ help }}</div>{% endif %}</div>'
+)
+
+# Obsah accessibility nápovědy
+_A11Y_HELP_MD = """
+**Navigace pomocí klávesnice:**
+- `Tab` / `Shift+Tab` - přepínání mezi prvky
+- `Enter` / `Space` - aktivace tlačítek
+- `Escape` - zavření dialogů
+- `Arrow keys` - navigace v grafech (pokud je podporována)
+
+**Screen reader podpora:**
+- Všechny grafy mají textové alternativy
+- Metriky jsou označeny pomocí ARIA labelů
+- Struktura je sémanticky správná
+
+**Kontrasty:**
+- Aplikace respektuje systémové nastavení high contrast
+- Podporuje dark/light mode
+- Barvy jsou vybírány s ohledem na barvoslepost
+"""
+
+# Překlady UI – konstanta modulu, při volání se jen vybere slovník
+_LANG = {
+    "en": {
+        "title": "Your Personal Emotional Profile",
+        "download_pdf": "Download Personal PDF Report",
+        "insights": "Personal Insights",
+        "privacy": "Privacy Protection: This report is intended only for you.",
+        "help_text": """
+**How to read emotional space:**
+- **X-axis = Valence** (negative ↔ positive)
+- **Z-axis = Arousal** (low ↔ high)
+- **Y-axis = Dominance** (low ↔ high control)
+            """
+    },
+    "cs": {  # Czech (default)
+        "title": "Tvůj osobní emoční profil",
+        "download_pdf": "Stáhnout osobní PDF report", 
+        "insights": "Osobní insighty",
+        "privacy": "Ochrana soukromí: Tento report je určen pouze pro tebe.",
+        "help_text": """
+**Jak číst prostor emocí:**
+- **Osa X = Valence** (negativní ↔ pozitivní)
+- **Osa Z = Arousal** (nízký ↔ vysoký)
+- **Osa Y = Dominance** (nízká ↔ vysoká kontrola)
+            """
+    },
+}
+
+def add_accessibility_features():
+    """Přidá accessibility features do aplikace"""
     
-    # Přidání alt textu a ARIA labelu
-    fig.update_layout(
-        title={
-            'text': title,
-            'x': 0.5,
-            'xanchor': 'center',
-            'font': {'size': 16, 'color': '#1f2937'}
-        },
+    # CSS je konstanta modulu – string se sestaví jednou při importu.
+    # Emitujeme ho při každém běhu skriptu: Streamlit při rerunu odstraní
+    # elementy, které skript znovu nevykreslil, takže by styly zmizely.
+    # st.html obchází markdown pipeline a čistě <style> obsah nezabírá místo v layoutu.
+    st.html(_CSS)
+    # Začátek běhu: zahodí fragmenty, které předchozí běh nestihl vykreslit
+    # (st.stop, rerun nebo chyba před flush) – jinak by se vykreslily dvakrát
+    _session_buffer().parts.clear()
+
+def _register_template():
+    """Zaregistruje šablonu "a11y" při prvním grafu (plotly.graph_objects se importuje až tady)"""
+    if _A11Y_TEMPLATE in pio.templates:
+        return
+    import plotly.graph_objects as go
+    pio.templates[_A11Y_TEMPLATE] = go.layout.Template(layout=dict(
         # Lepší barvy pro colorblind uživatele
-        colorway=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b'],
+        colorway=_COLORWAY,
+        title=dict(x=0.5, xanchor='center', font=_TITLE_FONT),
+    ))
+
+def _upgrade_to_webgl(fig, min_points=_WEBGL_MIN_POINTS):
+    """Nahradí velké SVG scatter traces jejich WebGL (Scattergl) variantou"""
+    import plotly.graph_objects as go
+    traces = []
+    changed = False
+    for i, tr in enumerate(fig.data):
+        if tr.type == 'scatter' and tr.x is not None and len(tr.x) > min_points:
+            props = tr.to_plotly_json()
+            props.pop('type', None)
+            try:
+                traces.append(go.Scattergl(props))
+                changed = True
+            except ValueError as e:
+                # Vlastnost, kterou Scattergl nepodporuje (např. line.smoothing) – trace zůstane SVG,
+                # aby se tiše nezahodila
+                reason = next((ln for ln in str(e).splitlines() if ln.strip()), "")
+                logger.info(f"Trace {tr.name or i} zůstává SVG, Scattergl nepodporuje: {reason}")
+                traces.append(tr)
+        else:
+            traces.append(tr)
+    if changed:
+        fig.data = ()
+        fig.add_traces(traces)
+    return fig
+
+def _slice_point_arrays(props, n, idx):
+    """Vybere indexy idx ze všech per-point polí délky n (text, customdata, error_y.array,
+    marker.symbol, ...), aby zůstala zarovnaná se zmenšenými x/y; vrací jen změněné klíče"""
+    update = {}
+    for key, val in props.items():
+        if isinstance(val, dict):
+            nested = _slice_point_arrays(val, n, idx)
+            if nested:
+                update[key] = nested
+        elif isinstance(val, np.ndarray) and val.ndim and len(val) == n:
+            update[key] = val[idx]
+        elif isinstance(val, (list, tuple)) and len(val) == n:
+            update[key] = [val[i] for i in idx]
+    return update
+
+def _downsample_traces(fig, max_points=_MAX_POINTS):
+    """Zmenší čárové traces nad max_points pomocí LTTB; bodová mračna nechává beze změny"""
+    for tr in fig.data:
+        if tr.type not in ('scatter', 'scattergl') or tr.x is None or tr.y is None:
+            continue
+        # LTTB zachovává tvar křivky – u samotných markerů by jen tiše zahodil body
+        # (bez mode kreslí plotly nad 20 bodů čáru)
+        if tr.mode and 'lines' not in tr.mode:
+            continue
+        n = len(tr.y)
+        if n <= max_points or len(tr.x) != n:
+            continue
+        # LTTB běží nad numerickou kopií, do trace se vrací původní hodnoty (např. datetime64)
+        x_orig, y_orig = np.asarray(tr.x), np.asarray(tr.y)
+        try:
+            x = x_orig.astype('datetime64[ns]').astype(np.int64) if x_orig.dtype.kind == 'M' else x_orig
+            x = np.asarray(x, dtype=np.float64)
+            y = np.asarray(y_orig, dtype=np.float64)
+        except (TypeError, ValueError):
+            continue  # kategoriální osa – LTTB nemá smysl
+        if np.any(np.diff(x) < 0):
+            continue  # LTTB předpokládá seřazené x
+        idx = lttb_indices(x, y, max_points)
+
+        update = _slice_point_arrays(tr.to_plotly_json(), n, idx)
+        update['x'], update['y'] = x_orig[idx], y_orig[idx]
+        tr.update(update)
+    return fig
+
+@lru_cache(maxsize=256)
+def _aria_html(title, description, data_summary):
+    """HTML textového popisu grafu – labely jsou mezi reruny stejné, proto cache"""
+    return _CHART_DESC_TMPL.format(
+        title=_esc(title),
+        description=_esc(description),
+        data_summary=data_summary,
     )
+
+def make_chart_accessible(fig, title, description, data_summary="", data=None, webgl=True,
+                          max_points=_MAX_POINTS, buffered=False):
+    """Přidá accessibility features do plotly grafů"""
+    
+    # Textové shrnutí dat pro screen readery – jeden vektorizovaný průchod přes numpy
+    if data is not None and not data_summary:
+        a = np.asarray(data, dtype=np.float64).ravel()
+        a = a[~np.isnan(a)]
+        # Prázdná nebo celá NaN data → bez shrnutí (min/max by jinak spadly nebo daly "nan")
+        if np.isfinite(a).any():
+            data_summary = (f"min {a.min():.2f}, max {a.max():.2f}, "
+                            f"průměr {a.mean():.2f}, n={a.size}")
+            fig._a11y_summary = data_summary
+    
+    # Dlouhé série zmenšíme na vizuální rozpočet bodů
+    if max_points:
+        _downsample_traces(fig, max_points)
+    
+    # Scatter grafy nad _WEBGL_MIN_POINTS body vykreslujeme přes WebGL místo SVG
+    if webgl:
+        _upgrade_to_webgl(fig)
+    
+    # Colorway a styl titulku nese šablona "a11y" (registrovaná jednou) – vrství se
+    # na vlastní šablonu grafu (např. plotly_dark), takže ta zůstane zachovaná
+    _register_template()
+    fig.layout.template.update(pio.templates[_A11Y_TEMPLATE])
+    fig.layout.title.text = title
     
     # Přidání textového popisu pro screen readery
     if description:
-        st.markdown(f"""
-        <div class="chart-description" role="img" aria-label="{title}">
-            <span class="sr-only">Graf: {title}. {description}</span>
-            {data_summary}
-        </div>
-        """, unsafe_allow_html=True)
+        _emit(_aria_html(title, description, data_summary), buffered)
     
     return fig
 
-def create_accessible_metric_card(label, value, delta=None, help_text=""):
+def _card_html(label, value, delta=None, help_text=""):
+    """Sestaví HTML jedné metric card ze šablony"""
+    return _CARD_TPL.render(label=label, value=value, delta=delta, help=help_text)
+
+def create_accessible_metric_card(label, value, delta=None, help_text="", buffered=False):
     """Vytvoří accessibility-friendly metric card"""
     
-    delta_text = f" ({delta})" if delta else ""
-    aria_label = f"{label}: {value}{delta_text}"
-    
-    st.markdown(f"""
-    <div class="metric-container" role="region" aria-label="{aria_label}">
-        <h3 style="margin:0; font-size:14px; color:#6B7280;">{label}</h3>
-        <div style="font-size:24px; font-weight:bold; color:#1f2937;" aria-live="polite">
-            {value}
-        </div>
-        {f'<div style="font-size:12px; color:#059669;">{delta}</div>' if delta else ''}
-        {f'<div class="sr-only">{help_text}</div>' if help_text else ''}
-    </div>
-    """, unsafe_allow_html=True)
+    _emit(_card_html(label, value, delta, help_text), buffered)
+
+def create_accessible_metric_cards(cards):
+    """Vykreslí více metric cards jedním st.markdown voláním.
+
+    cards = seznam tuplů (label, value[, delta[, help_text]])
+    """
+    cards_html = "".join(_card_html(*card) for card in cards)
+    st.markdown(f'<div class="metric-grid">{cards_html}</div>', unsafe_allow_html=True)
 
 def add_keyboard_navigation_hints():
     """Přidá hints pro keyboard navigation"""
     
     with st.expander("♿ Accessibility nápověda"):
-        st.markdown("""
-        **Navigace pomocí klávesnice:**
-        - `Tab` / `Shift+Tab` - přepínání mezi prvky
-        - `Enter` / `Space` - aktivace tlačítek
-        - `Escape` - zavření dialogů
-        - `Arrow keys` - navigace v grafech (pokud je podporována)
-        
-        **Screen reader podpora:**
-        - Všechny grafy mají textové alternativy
-        - Metriky jsou označeny pomocí ARIA labelů
-        - Struktura je sémanticky správná
-        
-        **Kontrasty:**
-        - Aplikace respektuje systémové nastavení high contrast
-        - Podporuje dark/light mode
-        - Barvy jsou vybírány s ohledem na barvoslepost
-        """)
+        st.markdown(_A11Y_HELP_MD)
 
 def add_language_support():
     """Přidá základní podporu pro více jazyků"""
     
-    # Detekce jazyka z browseru (můžete rozšířit)
-    lang = st.query_params.get("lang", "cs")
+    # Detekce jazyka z URL jen jednou za session (můžete rozšířit)
+    if "_lang" not in st.session_state:
+        st.session_state["_lang"] = st.query_params.get("lang", "cs")
     
-    if lang == "en":
-        return {
-            "title": "Your Personal Emotional Profile",
-            "download_pdf": "Download Personal PDF Report",
-            "insights": "Personal Insights",
-            "privacy": "Privacy Protection: This report is intended only for you.",
-            "help_text": """
-**How to read emotional space:**
-- **X-axis = Valence** (negative ↔ positive)
-- **Z-axis = Arousal** (low ↔ high)
-- **Y-axis = Dominance** (low ↔ high control)
-            """
-        }
-    else:  # Czech (default)
-        return {
-            "title": "Tvůj osobní emoční profil",
-            "download_pdf": "Stáhnout osobní PDF report", 
-            "insights": "Osobní insighty",
-            "privacy": "Ochrana soukromí: Tento report je určen pouze pro tebe.",
-            "help_text": """
-**Jak číst prostor emocí:**
-- **Osa X = Valence** (negativní ↔ pozitivní)
-- **Osa Z = Arousal** (nízký ↔ vysoký)
-- **Osa Y = Dominance** (nízká ↔ vysoká kontrola)
-            """
-        }
+    return _LANG.get(st.session_state["_lang"], _LANG["cs"])
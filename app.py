@@ -1,17 +1,18 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
 from pathlib import Path
+import re
 import time
 import traceback
 
-from utils import standardize_hand_columns, compute_deltas
+from utils import standardize_hand_columns, compute_deltas, insight_levels, lttb_indices, box_stats
 from pdf_utils import build_pdf_report
 from error_handler import (
     safe_read_csv, validate_data_structure, safe_numeric_conversion,
-    validate_user_id, handle_exception, log_user_activity, logger
+    validate_user_id, handle_exception, log_user_activity, batch_user_activity, logger
 )
 from thematic_analysis import (
     load_thematic_data, analyze_user_strategy, 
@@ -50,15 +51,249 @@ HELP_TEXT_INTRO = """
 - **Reakční doba** = průměrný čas vašeho rozhodnutí (kratší = větší míra intuice)
 """
 
+# Barvy bublin podle reakční doby: emerald pro běžné časy, světle hnědá pro unikátní
+SCATTER_COLORS = {"Běžný": "#10B981", "Unikátní": "#D2B48C"}
+
+# Minimální počet hodnocených slov pro vykreslení grafů
+MIN_WORDS_FOR_CHARTS = 3
+
+# Rozlišení hustotní mapy skupiny (CONTOUR_BINS × CONTOUR_BINS)
+CONTOUR_BINS = 40
+
+# Max. počet uživatelů držených v cache grafů a PDF (nejstarší záznamy se vyhodí)
+USER_CACHE_ENTRIES = 128
+
+# Numerické sloupce hand datasetu
+HAND_NUMERIC_COLS = ["Pos X", "Pos Y", "Pos Z", "First reaction time", "Total reaction time"]
+# Sloupce hand datasetu, které se načítají (ostatní, např. "Hand", parser vůbec nematerializuje)
+HAND_COLUMNS = ["ID", "Term", "Order"] + HAND_NUMERIC_COLS
+
+# hand_dataset.csv větší než tento limit se čte po blocích (omezí špičku paměti)
+HAND_CHUNK_MIN_BYTES = 50 * 1024 * 1024
+HAND_CHUNK_ROWS = 100_000
+
+# Radar a boxploty jen znázorňují hodnoty z metrik a anotací → statický plot bez hover/zoom obsluhy v prohlížeči
+STATIC_CHART_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
+# Max. počet bodů v grafu reakčních dob; delší řada se zhušťuje přes LTTB
+LINE_MAX_POINTS = 500
+
+# Sdílené layouty grafů – definované jednou na úrovni modulu, grafy na ně jen odkazují
+FONT_FAMILY = "Inter, system-ui, sans-serif"
+TITLE_STYLE = dict(font=dict(size=18, color='#111827', family=FONT_FAMILY), x=0.5, pad=dict(t=20, b=20))
+BOX_TITLE_STYLE = dict(font=dict(size=16, color='#111827', family=FONT_FAMILY), x=0.3, pad=dict(t=20, b=20))
+BACKGROUND_RECT = dict(
+    type="rect",
+    xref="paper", yref="paper",
+    x0=0, y0=0, x1=1, y1=1,
+    layer="below",
+    line_width=0,
+)
+
+RADAR_LAYOUT = dict(
+    polar=dict(
+        radialaxis=dict(
+            visible=True,
+            gridcolor='rgba(156, 163, 175, 0.4)',
+            linecolor='rgba(156, 163, 175, 0.6)',
+            tickfont=dict(size=10, color='#6B7280')
+        ),
+        angularaxis=dict(
+            gridcolor='rgba(156, 163, 175, 0.4)',
+            linecolor='rgba(156, 163, 175, 0.6)',
+            tickfont=dict(size=12, color='#374151', family=FONT_FAMILY)
+        ),
+        bgcolor='rgba(249, 250, 251, 0.5)'
+    ),
+    showlegend=True,
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=-0.1,
+        xanchor="center",
+        x=0.5,
+        font=dict(size=12, color='#374151', family=FONT_FAMILY),
+        bgcolor="rgba(255, 255, 255, 0.8)",
+        bordercolor="rgba(229, 231, 235, 1)",
+        borderwidth=1
+    ),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    font=dict(color='#111827', size=12, family=FONT_FAMILY),
+    margin=dict(l=60, r=60, t=80, b=80),
+    height=500
+)
+
+BOX_LAYOUT = dict(
+    yaxis=dict(
+        title_font=dict(size=13, color='#374151', family=FONT_FAMILY),
+        tickfont=dict(size=11, color='#6B7280'),
+        gridcolor='rgba(156, 163, 175, 0.3)',
+        zerolinecolor='#9CA3AF',
+        zerolinewidth=1.5
+    ),
+    xaxis_title="",
+    xaxis=dict(
+        tickfont=dict(size=12, color='#374151', family=FONT_FAMILY),
+        showgrid=False
+    ),
+    showlegend=True,
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="center",
+        x=0.5,
+        font=dict(size=11, color='#374151')
+    ),
+    plot_bgcolor='rgba(249, 250, 251, 1)',
+    paper_bgcolor='white',
+    font=dict(color='#111827', family=FONT_FAMILY),
+    margin=dict(l=60, r=20, t=120, b=40),
+    height=450
+)
+
+# Popisek "Ty: …" u boxplotů – x, y a text se doplní per uživatel
+BOX_ANNOTATION = dict(
+    showarrow=True,
+    arrowhead=2,
+    arrowcolor="#F59E0B",
+    arrowwidth=2,
+    ax=70, ay=-10,
+    font=dict(color='#D97706', size=12, family=FONT_FAMILY),
+    bgcolor="rgba(255, 255, 255, 0.9)",
+    bordercolor="#F59E0B",
+    borderwidth=1
+)
+
+# Osy emočního prostoru (scatter + kontury), liší se jen sytostí mřížky
+PLANE_AXIS = dict(
+    title_font=dict(size=13, color='#374151', family=FONT_FAMILY),
+    tickfont=dict(size=11, color='#6B7280'),
+    zerolinecolor='#9CA3AF',
+    zerolinewidth=2,
+    showline=True,
+    linecolor='#E5E7EB'
+)
+
+SCATTER_LAYOUT = dict(
+    xaxis_title="<b>Valence</b> (slabá ← → silná emoční reakce)",
+    yaxis_title="<b>Lateralita</b> (nepříjemné ← → příjemné)",
+    xaxis=dict(PLANE_AXIS, gridcolor='rgba(156, 163, 175, 0.3)'),
+    yaxis=dict(PLANE_AXIS, gridcolor='rgba(156, 163, 175, 0.3)'),
+    plot_bgcolor='rgba(249, 250, 251, 1)',
+    paper_bgcolor='white',
+    font=dict(color='#111827', family=FONT_FAMILY),
+    margin=dict(l=60, r=40, t=80, b=60),
+    height=500,
+    legend=dict(
+        title_text="",  # Odstraní název nad legendou
+        font=dict(color='#000000', size=12, family=FONT_FAMILY)  # Černý text legendy
+    ),
+    # Přidání subtilního gradientu do pozadí
+    shapes=[dict(BACKGROUND_RECT, fillcolor="rgba(249, 250, 251, 0.8)")]
+)
+
+CONTOUR_LAYOUT = dict(
+    xaxis_title="<b>Valence</b> (slabá ← → silná emoční reakce)",
+    yaxis_title="<b>Lateralita</b> (nepříjemné ← → příjemné)",
+    xaxis=dict(PLANE_AXIS, gridcolor='rgba(156, 163, 175, 0.2)'),
+    yaxis=dict(PLANE_AXIS, gridcolor='rgba(156, 163, 175, 0.2)'),
+    plot_bgcolor='white',
+    paper_bgcolor='white',
+    font=dict(color='#111827', family=FONT_FAMILY),
+    margin=dict(l=60, r=100, t=80, b=60),
+    height=550
+)
+
+# Osy grafu reakční doby – titulek se doplní per osa
+LINE_AXIS = dict(
+    title_font=dict(size=13, color='#374151', family=FONT_FAMILY),
+    tickfont=dict(size=11, color='#6B7280'),
+    showgrid=True,
+    gridcolor="rgba(156, 163, 175, 0.3)",
+    showline=True,
+    linecolor="#E5E7EB",
+    linewidth=1
+)
+
+LINE_LAYOUT = dict(
+    plot_bgcolor="white",
+    paper_bgcolor="white",
+    font=dict(family=FONT_FAMILY, size=12, color="#111827"),
+    xaxis=dict(title="<b>Pořadí hodnocení</b>", **LINE_AXIS),
+    yaxis=dict(title="<b>Reakční doba (sekundy)</b>", **LINE_AXIS),
+    hovermode="x unified",
+    margin=dict(l=60, r=20, t=80, b=60),
+    height=400,
+    # Přidání jemného gradientního pozadí
+    shapes=[dict(BACKGROUND_RECT, fillcolor="rgba(249, 250, 251, 0.5)")]
+)
+
+# Pravidla insightů: (sloupec, tolerance, text nad průměrem, pod průměrem, blízko průměru)
+INSIGHT_RULES = (
+    ("delta_valence", 0.1,
+     "Celkově vnímáš slova **příjemnějšími** než většina účastníků.",
+     "Celkově vnímáš slova **nepříjemnějšími** než většina účastníků.",
+     "Tvoje vnímání příjemnosti slov je **podobné** většině účastníků."),
+    ("delta_arousal", 0.1,
+     "Slova v tobě vyvolávala **silnější emoční odezvu** než u ostatních.",
+     "Reaguješ spíše **klidněji** (mírnější emoční intenzita) než většina.",
+     "Intenzita prožívání je **blízko průměru** skupiny."),
+    ("First reaction time", 0.2,
+     "Rozhoduješ se **pomaleji** než je průměr skupiny.",
+     "Rozhoduješ se **rychleji** než je průměr skupiny.",
+     "Tvoje reakční doba je **srovnatelná** se skupinou."),
+    ("Pos Y", 0.1,
+     "V průměru se cítíš **více dominantně** (silnější pocit kontroly) než většina.",
+     "V průměru se cítíš **méně dominantně** než většina.",
+     "Pocit kontroly (dominance) je **blízko průměru**."),
+)
+INSIGHT_COLS = [rule[0] for rule in INSIGHT_RULES]
+INSIGHT_TOL = np.array([rule[1] for rule in INSIGHT_RULES])
+
+# Metric karty: (popisek, klíč skupinového průměru)
+METRIC_CARDS = (("Lateralita (X)", "delta_valence"), ("Valence (Z)", "delta_arousal"), ("Arousal (Y)", "Pos Y"))
+
+def hand_usecols(path: Path):
+    """Původní názvy sloupců hand CSV, které po standardizaci aplikace používá (čte se jen hlavička)"""
+    try:
+        header = pd.read_csv(path, sep=";", nrows=0, encoding="utf-8-sig").columns
+    except Exception:
+        return None  # chybu souboru nahlásí až safe_read_csv
+    standardized = standardize_hand_columns(pd.DataFrame(columns=header)).columns
+    return [raw for raw, name in zip(header, standardized) if name in HAND_COLUMNS]
+
+def prepare_hand(df: pd.DataFrame) -> pd.DataFrame:
+    """Standardizace sloupců a numerická konverze hand datasetu (celý soubor nebo jeden blok)"""
+    df = standardize_hand_columns(df)
+    # float32 stačí pro souřadnice i reakční časy a zmenší objem dat v agregacích na polovinu
+    return safe_numeric_conversion(df, HAND_NUMERIC_COLS, dtype="float32")
+
+def data_version() -> tuple:
+    """Časy poslední změny vstupních CSV – součást klíče cache, po úpravě dat se vše přepočítá"""
+    paths = (DATA_DIR / "vybrana_slova_30.csv", DATA_DIR / "hand_dataset.csv")
+    return tuple(p.stat().st_mtime_ns if p.exists() else None for p in paths)
+
 # Přidání cachingu pro lepší performance
-@st.cache_data(ttl=3600)  # Cache na 1 hodinu
-def load_and_process_data():
-    """Načte a zpracuje data s cachingem"""
+# cache_resource: odvozené struktury jsou jen pro čtení, sdílí se bez pickle/unpickle při každém rerunu
+@st.cache_resource(ttl=3600)  # Cache na 1 hodinu
+def load_and_process_data(version: tuple = ()):
+    """Načte a zpracuje data s cachingem (version = data_version(), slouží jen jako klíč cache)
+
+    Vrací (deltas_all, by_id, population) – sdílené objekty, volající je nesmí měnit.
+    """
     start_time = time.time()
     
     # Načítání dat s error handlingem
-    vybrana = safe_read_csv(DATA_DIR / "vybrana_slova_30.csv")
-    hand = safe_read_csv(DATA_DIR / "hand_dataset.csv", sep=";", engine="python")
+    # pyarrow parser je vícevláknový; bez pyarrow se použije C parser (python engine byl zbytečně pomalý)
+    vybrana = safe_read_csv(DATA_DIR / "vybrana_slova_30.csv", engine="pyarrow")
+    # Velký soubor se čte po blocích, každý blok se hned standardizuje a zmenší na float32
+    hand_path = DATA_DIR / "hand_dataset.csv"
+    chunked = hand_path.exists() and hand_path.stat().st_size > HAND_CHUNK_MIN_BYTES
+    hand = safe_read_csv(hand_path, sep=";", engine="pyarrow", dtype={"ID": "string", "Term": "string"},
+                         usecols=hand_usecols(hand_path),
+                         chunksize=HAND_CHUNK_ROWS if chunked else None, transform=prepare_hand)
     
     if vybrana is None or hand is None:
         st.stop()
@@ -72,69 +307,452 @@ def load_and_process_data():
     if not validate_data_structure(hand, hand_required, "hand dataset"):
         st.stop()
     
-    # Standardizace a numerická konverze
-    hand = standardize_hand_columns(hand)
-    numeric_cols = ["Pos X", "Pos Y", "Pos Z", "First reaction time", "Total reaction time"]
-    hand = safe_numeric_conversion(hand, numeric_cols)
+    # Delty a skupinové statistiky jsou pro všechny uživatele stejné → počítáme je jednou v cache
+    deltas_all = compute_deltas(hand, vybrana)
+    # Kategorie = každé ID/slovo uložené jednou, sloupce drží jen celočíselné kódy
+    # (Term až po merge – join s baseline běží nad stejným string dtype)
+    deltas_all["ID"] = deltas_all["ID"].astype("string").astype("category")
+    deltas_all["Term"] = deltas_all["Term"].astype("category")
+    # Jednou seřadit podle pořadí v úkolu → řádky každého uživatele jsou už seřazené
+    if "Order" in deltas_all.columns:
+        deltas_all = deltas_all.sort_values(["ID", "Order"], kind="stable", ignore_index=True)
+    
+    # Předrozdělení podle ID → výběr dat uživatele je O(1) lookup místo masky přes celý dataset
+    by_id = {user_id: group for user_id, group in deltas_all.groupby("ID", sort=False, observed=True)}
     
-    # Načtení uživatelů (volitelné)
-    users = None
-    if (DATA_DIR / "users.csv").exists():
-        users = safe_read_csv(DATA_DIR / "users.csv")
+    # Souvislá float64 pole vytažená jednou – průměry i percentily běží nad nimi bez pandas dispatch
+    arrays = {col: deltas_all[col].to_numpy(dtype=np.float64)
+              for col in ("delta_valence", "delta_arousal", "First reaction time", "Pos Y")}
+    population = {
+        "overall": {col: float(np.nanmean(arr)) for col, arr in arrays.items()},
+        "available_ids": frozenset(deltas_all["ID"].cat.categories.tolist()),  # kategorie jsou už unikátní; set → O(1) validace ID
+        # Seřazené hodnoty pro percentily přes np.searchsorted
+        "sorted_val": np.sort(arrays["delta_valence"]),
+        "sorted_ar": np.sort(arrays["delta_arousal"]),
+        # Průměry a počet slov každého účastníka – jeden groupby průchod místo výpočtu při každém požadavku
+        "per_user": deltas_all.groupby("ID", sort=False, observed=True).agg(
+            delta_valence=("delta_valence", "mean"),
+            delta_arousal=("delta_arousal", "mean"),
+            first_rt=("First reaction time", "mean"),
+            pos_y=("Pos Y", "mean"),
+            words_n=("Term", "nunique"),
+        ),
+    }
     
     load_time = time.time() - start_time
     logger.info(f"Data načtena za {load_time:.2f} sekund")
     
-    return vybrana, hand, users
+    return deltas_all, by_id, population
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_base_boxes(version: tuple = ()):
+    """Boxploty celé skupiny – stejné pro všechny uživatele, sestaví se jednou"""
+    deltas_all = load_and_process_data(version)[0]
+    
+    # Předpočítané kvartily místo všech hodnot → do prohlížeče jde 6 čísel na box, ne celý dataset
+    # Valence - elegantní moderní styl
+    box_val = go.Figure(go.Box(
+        x=["Všichni účastníci"],
+        **box_stats(deltas_all["delta_valence"]),
+        name="Všichni účastníci",
+        boxpoints=False,
+        fillcolor='rgba(99, 102, 241, 0.15)',  # Indigo s transparentností
+        line=dict(color='#6366F1', width=2.5),
+        marker=dict(color='#6366F1', size=6),
+        whiskerwidth=0.8,
+        boxmean=True  # Zobrazí průměr
+    ))
+    # Arousal - moderní fialový styl
+    box_ar = go.Figure(go.Box(
+        x=["Všichni účastníci"],
+        **box_stats(deltas_all["delta_arousal"]),
+        name="Všichni účastníci",
+        boxpoints=False,
+        fillcolor='rgba(139, 92, 246, 0.15)',  # Violet s transparentností
+        line=dict(color='#8B5CF6', width=2.5),
+        marker=dict(color='#8B5CF6', size=6),
+        whiskerwidth=0.8,
+        boxmean=True  # Zobrazí průměr
+    ))
+    return box_val, box_ar
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_base_contour(version: tuple = ()):
+    """Hustotní mapa celé skupiny – nezávisí na uživateli, počítá se jednou"""
+    deltas_all = load_and_process_data(version)[0]
+    
+    # Hustotu spočítáme jednou přes 2D histogram → do prohlížeče jde mřížka 40×40 místo všech bodů,
+    # velikost grafu tak nezávisí na počtu účastníků; počty i středy binů stačí v 32 bitech
+    xy = deltas_all[["delta_arousal","delta_valence"]].dropna().to_numpy()
+    H, xe, ye = np.histogram2d(xy[:, 0], xy[:, 1], bins=CONTOUR_BINS)
+    fig_contour = go.Figure(go.Contour(
+        z=H.T.astype(np.int32),
+        x=(0.5 * (xe[:-1] + xe[1:])).astype(np.float32),
+        y=(0.5 * (ye[:-1] + ye[1:])).astype(np.float32),
+        name="Skupina",
+        hovertemplate="Valence: %{x:.2f}<br>Lateralita: %{y:.2f}<br>Počet hodnocení: %{z:.0f}<extra></extra>"
+    ))
+    # Moderní color scheme - použijeme elegantní blue-purple gradient
+    fig_contour.update_traces(
+        contours_coloring="fill", 
+        contours_showlabels=False,  # Skryjeme labely pro čistší vzhled
+        colorscale=[
+            [0.0, "rgba(99, 102, 241, 0.1)"],      # Velmi světlý indigo
+            [0.2, "rgba(99, 102, 241, 0.3)"],      # Světlý indigo
+            [0.4, "rgba(139, 92, 246, 0.5)"],      # Středně fialová
+            [0.6, "rgba(168, 85, 247, 0.7)"],      # Tmavší fialová
+            [0.8, "rgba(147, 51, 234, 0.8)"],      # Fialová
+            [1.0, "rgba(126, 34, 206, 0.9)"]       # Nejintenzivnější fialová
+        ],
+        showscale=True,
+        colorbar=dict(
+            title=dict(
+                text="<b>Hustota účastníků</b><br><span style='font-size:11px'>nízká → vysoká</span>",
+                font=dict(color='#374151', size=12, family=FONT_FAMILY)
+            ),
+            tickfont=dict(color='#6B7280', size=10),
+            thickness=12,
+            len=0.7,
+            x=1.02
+        ),
+        line=dict(width=0.5, color='rgba(255, 255, 255, 0.3)')  # Jemné bílé okraje
+    )
+    
+    fig_contour.update_layout(
+        title=dict(TITLE_STYLE, text="<b>Emoční mapa skupiny + tvá slova</b>"),
+        **CONTOUR_LAYOUT
+    )
+    
+    return fig_contour
+
+@st.cache_data(ttl=3600, max_entries=USER_CACHE_ENTRIES, show_spinner=False)
+def build_figures(selected_id: str, version: tuple = ()) -> dict:
+    """Sestaví grafy pro daného uživatele; cache per ID, takže rerun po kliknutí grafy nepřepočítává"""
+    by_id, population = load_and_process_data(version)[1:]
+    overall = population["overall"]
+    sub = by_id[selected_id]
+    stats = population["per_user"].loc[selected_id]
+    user_val = stats["delta_valence"]
+    user_ar  = stats["delta_arousal"]
+    user_rt  = stats["first_rt"]
+    
+    # Radar chart - elegantní moderní gradient design
+    radar_categories = ["Lateralita (X)","Valence (Z)","Reakční doba"]
+    fig_radar = go.Figure()
+    
+    fig_radar.add_trace(go.Scatterpolar(
+        r=[user_val,user_ar,user_rt], 
+        theta=radar_categories, 
+        fill='toself', 
+        name='<b>Tvůj profil</b>',
+        line=dict(color='#F59E0B', width=3, smoothing=1.3),  # Amber s vyhlazením
+        fillcolor='rgba(245, 158, 11, 0.2)',
+        marker=dict(size=8, color='#D97706')
+    ))
+    fig_radar.add_trace(go.Scatterpolar(
+        r=[overall["delta_valence"],overall["delta_arousal"],overall["First reaction time"]],
+        theta=radar_categories, 
+        fill='toself', 
+        name='<b>Průměr skupiny</b>',
+        line=dict(color='#6366F1', width=2.5, dash='dot', smoothing=1.3),  # Indigo s tečkami
+        fillcolor='rgba(99, 102, 241, 0.15)',
+        marker=dict(size=6, color='#4F46E5')
+    ))
+    fig_radar.update_layout(
+        title=dict(TITLE_STYLE, text="<b>Tvůj emoční radar</b>"),
+        **RADAR_LAYOUT
+    )
+
+    # Boxploty - moderní design s gradientem
+    # Boxplot pro valenci - moderní design s gradientním pozadím
+    # Boxplot populace - sdílený podklad skupiny (cache)
+    box_val, box_ar = build_base_boxes(version)
+    fig_hist_val = go.Figure(box_val)
+    
+    # Přidání tvé hodnoty jako stylový bod
+    fig_hist_val.add_trace(go.Scatter(
+        x=["Všichni účastníci"],
+        y=[user_val],
+        mode="markers",
+        name="Tvá hodnota",
+        marker=dict(
+            color='#F59E0B',  # Moderní amber
+            size=16,
+            symbol="diamond",
+            line=dict(color='#D97706', width=2.5),
+            opacity=0.9
+        )
+    ))
+    
+    # Výpočet percentilu pro interpretaci
+    sorted_val = population["sorted_val"]
+    val_percentile = np.searchsorted(sorted_val, user_val) / sorted_val.size * 100
+    val_interpretation = f"Tvoje hodnocení bylo pozitivnější než u {val_percentile:.0f}% účastníků" if user_val > 0 else f"Tvoje hodnocení bylo negativnější než u {100-val_percentile:.0f}% účastníků"
+    
+    fig_hist_val.update_layout(
+        title=dict(BOX_TITLE_STYLE, text=f"<b>Jak vnímáš příjemnost slov oproti ostatním</b><br><span style='color:#6B7280; font-size:13px'>{val_interpretation}</span>"),
+        yaxis_title="<b>Lateralita</b> (nepříjemné ← 0 → příjemné)",
+        annotations=[dict(BOX_ANNOTATION, x=0, y=user_val, text=f"<b>Ty: {user_val:.2f}</b>")],
+        **BOX_LAYOUT
+    )
+
+    # Boxplot pro arousal - elegantní fialový design 
+    fig_hist_ar = go.Figure(box_ar)
+    
+    # Přidání tvé hodnoty - sladění s amber barvou
+    fig_hist_ar.add_trace(go.Scatter(
+        x=["Všichni účastníci"],
+        y=[user_ar],
+        mode="markers",
+        name="Tvá hodnota",
+        marker=dict(
+            color='#F59E0B',  # Stejná amber jako u valence
+            size=16,
+            symbol="diamond",
+            line=dict(color='#D97706', width=2.5),
+            opacity=0.9
+        )
+    ))
+    
+    # Výpočet percentilu pro interpretaci
+    sorted_ar = population["sorted_ar"]
+    ar_percentile = np.searchsorted(sorted_ar, user_ar) / sorted_ar.size * 100
+    ar_interpretation = f"Tvé reakce byly intenzivnější než u {ar_percentile:.0f}% účastníků" if user_ar > 0 else f"Tvé reakce byly klidnější než u {100-ar_percentile:.0f}% účastníků"
+    
+    fig_hist_ar.update_layout(
+        title=dict(BOX_TITLE_STYLE, text=f"<b>Jak intenzivně reaguješ na slova oproti ostatním</b><br><span style='color:#6B7280; font-size:13px'>{ar_interpretation}</span>"),
+        yaxis_title="<b>Valence</b> (slabá ← 0 → silná emoční reakce)",
+        annotations=[dict(BOX_ANNOTATION, x=0, y=user_ar, text=f"<b>Ty: {user_ar:.2f}</b>")],
+        **BOX_LAYOUT
+    )
+
+    # Scatter (bubliny) - elegantní moderní design s podmíněným barvením
+    # Kategorie barvy podle extrémních reakčních časů – jen numpy pole, sub se nekopíruje ani nemění
+    rt = sub["First reaction time"].to_numpy()
+    rt_q25, rt_q75 = np.nanpercentile(rt, [25, 75])
+    iqr = rt_q75 - rt_q25
+    extreme_threshold_high = rt_q75 + 1.5 * iqr
+    extreme_threshold_low = rt_q25 - 1.5 * iqr
+    
+    # Přiřadíme barvy: hnědá pro unikátní časy, emerald pro běžné
+    color_category = np.where((rt > extreme_threshold_high) | (rt < extreme_threshold_low), "Unikátní", "Běžný")
+    
+    # Velikost bublin jednou v numpy: nezáporná (NaN zůstává → bod bez velikosti jako dřív)
+    sizes = np.clip(rt, 0, None)
+    x_ar, y_val = sub["delta_arousal"].to_numpy(), sub["delta_valence"].to_numpy()
+    terms = sub[["Term"]].to_numpy()
+    
+    # WebGL (Scattergl) – vykreslení běží na GPU a neblokuje hlavní vlákno prohlížeče
+    fig_scatter = go.Figure()
+    for category in pd.unique(color_category).tolist():
+        mask = color_category == category
+        fig_scatter.add_trace(go.Scattergl(
+            x=x_ar[mask], y=y_val[mask],
+            mode="markers",
+            name=category,
+            customdata=terms[mask],
+            marker=dict(
+                color=SCATTER_COLORS[category],
+                size=sizes[mask],
+                sizemode="area",
+                line=dict(width=1.5, color='white'),
+                opacity=0.8,
+                sizemin=8,
+                sizeref=0.3
+            ),
+            hovertemplate="<b>%{customdata[0]}</b><br>" +
+                        "Valence: %{x:.2f}<br>" +
+                        "Lateralita: %{y:.2f}<br>" +
+                        "Reakční doba: %{marker.size:.2f}s<extra></extra>"
+        ))
+    
+    fig_scatter.update_layout(
+        title=dict(TITLE_STYLE, text="<b>Tvá slova v emočním prostoru</b>"),
+        **SCATTER_LAYOUT
+    )
+
+    # Kontury - sdílený podklad skupiny (cache) + tvá slova
+    fig_contour = build_base_contour(version)
+    
+    # Přidání tvých slov jako elegantní body
+    fig_contour.add_trace(go.Scattergl(
+        x=sub["delta_arousal"], y=sub["delta_valence"], 
+        mode="markers+text",
+        text=sub["Term"], 
+        textposition="top center",
+        marker=dict(
+            color="white",  # Bílé body pro maximální kontrast
+            size=12, 
+            opacity=1,
+            symbol="circle",
+            line=dict(color="#F59E0B", width=3)  # Amber okraj
+        ), 
+        name="<b>Tvá slova</b>",
+        textfont=dict(
+            color='#111827', 
+            size=10, 
+            family=FONT_FAMILY,
+            weight="bold"
+        ),
+        hovertemplate="<b>%{text}</b><br>" +
+                    "Δ arousal: %{x:.2f}<br>" +
+                    "Δ valence: %{y:.2f}<extra></extra>"
+    ))
+
+    # Line chart (pokud je Order) - elegantní moderní design
+    fig_line = None
+    if "Order" in sub.columns:
+        srt = sub  # seřazeno podle Order už v loaderu
+        if len(srt) > LINE_MAX_POINTS:
+            # Dlouhá řada → LTTB zachová tvar křivky s řádově méně body
+            srt = srt.iloc[lttb_indices(srt["Order"].to_numpy(), srt["First reaction time"].to_numpy(), LINE_MAX_POINTS)]
+        # Přímo go.Scatter – bez px wrapperu a jeho průchodů DataFrame
+        fig_line = go.Figure(go.Scatter(
+            x=srt["Order"].to_numpy(), y=srt["First reaction time"].to_numpy(),
+            mode="lines+markers",
+            name="",
+            line=dict(width=3, color="#10B981", smoothing=1.3),  # Elegantní emerald
+            marker=dict(
+                size=8, 
+                color="#059669", 
+                line=dict(width=2, color="white"),
+                symbol="circle"
+            ),
+            hovertemplate="<b>Pořadí:</b> %{x}<br><b>Reakční doba:</b> %{y:.2f}s<extra></extra>"
+        ))
+        
+        fig_line.update_layout(
+            title=dict(TITLE_STYLE, text="<b>Jak se měnila tvoje reakční doba během úkolu</b>"),
+            **LINE_LAYOUT
+        )
+
+    figs = {
+        "radar":    fig_radar,
+        "hist_val": fig_hist_val,
+        "hist_ar":  fig_hist_ar,
+        "scatter":  fig_scatter,
+        "contour":  fig_contour
+    }
+    if fig_line is not None:
+        figs["line_rt"] = fig_line
+    return figs
+
+@st.cache_data(ttl=3600, max_entries=USER_CACHE_ENTRIES, show_spinner=False)
+def get_pdf(selected_id: str, insight_text: str, qualitative_text: str = "", version: tuple = ()) -> bytes:
+    """Sestaví PDF report; cache per ID, opakované stažení je okamžité"""
+    stats = load_and_process_data(version)[2]["per_user"].loc[selected_id]
+    user_rt = stats["first_rt"]
+    words_n = int(stats["words_n"])
+
+    summary_text = (
+        "Shrnutí tvých výsledků v emočním mapování:\n\n"
+        f"Hodnotil(a) jsi {words_n} slov na třech dimenzích:\n"
+        "• Valence (X-osa): jak příjemné/nepříjemné slovo vnímáš\n"
+        "• Arousal (Z-osa): jak aktivující/uklidňující slovo na tebe působí\n" 
+        "• Dominance (Y-osa): jakou míru kontroly u slova cítíš\n\n"
+        f"Tvoje průměrná reakční doba: {user_rt:.2f} sekund\n"
+        f"Celkový počet hodnocených slov: {words_n}\n\n"
+        "Delta metriky (Δ) ukazují, o kolik se tvoje hodnocení lišila od průměru populace. "
+        "Pozitivní hodnoty = vyšší hodnocení než průměr, negativní = nižší než průměr."
+    )
+    
+    pdf_bytes = build_pdf_report(selected_id, summary_text, insight_text, build_figures(selected_id, version), qualitative_text)
+    log_user_activity(selected_id, "pdf_generated", "PDF report úspěšně vygenerován")
+    return pdf_bytes
+
+@st.cache_data(ttl=3600, max_entries=USER_CACHE_ENTRIES, show_spinner=False)
+def get_qualitative(selected_id: str, version: tuple = ()) -> tuple:
+    """Kvalitativní analýza uživatele – strategie, citáty a texty pro PDF i stránku; cache per ID"""
+    thematic_df = load_thematic_data()
+    if thematic_df.empty:
+        return None, [], "", ""
+    deltas_all, by_id, _ = load_and_process_data(version)
+    user_analysis = analyze_user_strategy(by_id[selected_id], deltas_all)
+    matching_quotes = get_matching_quotes(user_analysis, thematic_df)
+    return (user_analysis, matching_quotes,
+            generate_qualitative_insights(user_analysis, []),
+            generate_qualitative_insights(user_analysis, matching_quotes))
+
+def _pdf_request_button(placeholder, selected_id: str) -> bool:
+    """Tlačítko pro vygenerování PDF v placeholderu; po neúspěchu s chybou a možností zkusit znovu"""
+    with placeholder.container():
+        if st.session_state.get("pdf_failed_for") == selected_id:
+            st.error("⚠️ **Varování:** Nepodařilo se vygenerovat PDF report.")
+            return st.button("🔄 Zkusit znovu vygenerovat PDF")
+        return st.button("📄 Vygenerovat PDF report")
+
+@st.fragment
+def render_pdf_section(selected_id: str, insight_text: str, qualitative_text: str, version: tuple = ()):
+    """PDF tlačítko a stažení; fragment – kliknutí přepočítá jen tuto sekci, ne celou stránku"""
+    # Tlačítko, spinner i stažení sdílí jedno místo – po kliknutí tlačítko nahradí download
+    placeholder = st.empty()
+    if st.session_state.get("pdf_for") != selected_id:
+        if not _pdf_request_button(placeholder, selected_id):
+            return
+        st.session_state["pdf_for"] = selected_id
+        st.session_state.pop("pdf_failed_for", None)
+    try:
+        with placeholder, st.spinner("Generuji PDF report..."):
+            pdf_bytes = get_pdf(selected_id, insight_text, qualitative_text, version)
+    except Exception as e:
+        logger.error(f"Chyba při generování PDF pro {selected_id}: {e}")
+        # Bez pdf_for se generování při dalších rerunech neopakuje samo, jen po kliknutí
+        st.session_state.pop("pdf_for", None)
+        st.session_state["pdf_failed_for"] = selected_id
+        st.rerun()
+    placeholder.download_button("📄 Stáhnout osobní PDF report", data=pdf_bytes,
+                                file_name=f"{selected_id}_emocni_profil.pdf", mime="application/pdf")
+
+@st.fragment
+def render_error_details(selected_id, error: str, error_time: str):
+    """Technické detaily chyby; fragment – přepnutí checkboxu nespouští znovu celou aplikaci"""
+    if st.checkbox("🔧 Zobrazit technické detaily"):
+        st.code(f"ID: {selected_id}")
+        st.code(f"Chyba: {error}")
+        st.code(f"Čas: {error_time}")
+        
+    # Přidáme tlačítko pro restart (celé aplikace)
+    if st.button("🔄 Zkusit znovu"):
+        st.rerun(scope="app")
 
 @handle_exception
+@batch_user_activity
 def main():
     """Hlavní funkce aplikace s error handlingem"""
     
-    # Načtení a zpracování dat
-    vybrana, hand, users = load_and_process_data()
+    # Načtení a zpracování dat (včetně delt a skupinových průměrů)
+    version = data_version()
+    deltas_all, by_id, population = load_and_process_data(version)
+    overall = population["overall"]
 
     # -----------------------------
     # Získání ID z URL (povinné)
     # -----------------------------
-    deltas_all = compute_deltas(hand, vybrana)
 
     # ID musí být zadáno v URL
-    try:
-        q = st.query_params
-        selected_id = q.get("ID", None)
-        if isinstance(selected_id, list):
-            selected_id = selected_id[0] if selected_id else None
-    except Exception:
-        try:
-            q = st.experimental_get_query_params()
-            selected_id = q.get("ID", [None])[0] if q else None
-        except:
-            selected_id = None
+    # st.query_params je k dispozici vždy (streamlit>=1.37) a get() vrací jedinou hodnotu
+    selected_id = st.query_params.get("ID")
 
     # Validace uživatelského ID
-    available_ids = sorted(deltas_all["ID"].dropna().astype(str).unique())
-    if not validate_user_id(selected_id, available_ids):
+    if not validate_user_id(selected_id, population["available_ids"]):
         st.stop()
 
     # Log aktivity uživatele
     log_user_activity(selected_id, "page_access", f"Přístup k osobnímu reportu")
 
-    sub = deltas_all[deltas_all["ID"].astype(str) == str(selected_id)].copy()
-    if sub.empty:
+    sub = by_id.get(str(selected_id))
+    if sub is None or sub.empty:
         logger.error(f"Prázdná data pro ID {selected_id}")
         st.error(f"🚫 **Pro ID `{selected_id}` nebyla nalezena žádná data.**")
         st.stop()
 
-    # Skupinové průměry
-    overall = deltas_all[["delta_valence","delta_arousal","First reaction time","Pos Y"]].mean(numeric_only=True)
-
-    # Uživatelské průměry
-    user_val = sub["delta_valence"].mean()
-    user_ar  = sub["delta_arousal"].mean()
-    user_rt  = sub["First reaction time"].mean()
-    user_dom = sub["Pos Y"].mean()
-    words_n  = sub["Term"].nunique()
+    # Uživatelské průměry (předpočítané v cache)
+    stats = population["per_user"].loc[str(selected_id)]
+    user_val = stats["delta_valence"]
+    user_ar  = stats["delta_arousal"]
+    user_rt  = stats["first_rt"]
+    user_dom = stats["pos_y"]
+    words_n  = int(stats["words_n"])
 
     # Log statistik
     log_user_activity(selected_id, "stats_calculated", f"Words: {words_n}, Avg RT: {user_rt:.2f}")
@@ -149,14 +767,22 @@ def main():
     with st.expander("🔬 **Připomenutí: O čem byl výzkum**", expanded=False):
         st.markdown(RESEARCH_INTRO)
     
-    st.info("💡 **Tip:** Tento report si můžeš stáhnout jako PDF pomocí tlačítka níže. **Všechny grafy jsou interaktivní** – najetím myší na prvky získáte podrobnosti. Můžete také přibližovat a oddalovat pohled.")
+    st.info("💡 **Tip:** Tento report si můžeš stáhnout jako PDF pomocí tlačítka níže. **Grafy slov a reakčních dob jsou interaktivní** – najetím myší na prvky získáte podrobnosti. Můžete také přibližovat a oddalovat pohled.")
     st.markdown(HELP_TEXT_INTRO)
 
     c1,c2,c3,c4 = st.columns(4)
     c1.metric("Hodnocených slov", f"{words_n}")
-    c2.metric("Lateralita (X)", f"{user_val:.2f}", f"{user_val - overall['delta_valence']:+.2f} vs. průměr")
-    c3.metric("Valence (Z)", f"{user_ar:.2f}",  f"{user_ar - overall['delta_arousal']:+.2f} vs. průměr")
-    c4.metric("Arousal (Y)", f"{user_dom:.2f}", f"{user_dom - overall['Pos Y']:+.2f} vs. průměr")
+    # Všechny tři odchylky od průměru jedním numpy odečtem
+    user_vec = np.array([user_val, user_ar, user_dom], dtype=np.float64)
+    diffs = user_vec - np.array([overall[key] for _, key in METRIC_CARDS], dtype=np.float64)
+    for col, (label, _), value, diff in zip((c2, c3, c4), METRIC_CARDS, user_vec, diffs):
+        col.metric(label, f"{value:.2f}", f"{diff:+.2f} vs. průměr")
+
+    # Příliš málo slov na smysluplné grafy → zůstane jen shrnutí výše, grafy ani PDF se nestaví
+    if words_n < MIN_WORDS_FOR_CHARTS:
+        st.warning(f"⚠️ **Hodnoceno méně než {MIN_WORDS_FOR_CHARTS} slov** – grafy a PDF report nelze sestavit.")
+        log_user_activity(selected_id, "charts_skipped", f"Words: {words_n}")
+        return
 
     # Grafy – tvorba s error handlingem
     # -----------------------------
@@ -180,486 +806,7 @@ def main():
             st.error("🚫 **Chyba:** Všechna numerická data jsou prázdná (NaN)")
             st.stop()
             
-        # Radar chart - elegantní moderní gradient design
-        radar_categories = ["Lateralita (X)","Valence (Z)","Reakční doba"]
-        fig_radar = go.Figure()
-        
-        fig_radar.add_trace(go.Scatterpolar(
-            r=[user_val,user_ar,user_rt], 
-            theta=radar_categories, 
-            fill='toself', 
-            name='<b>Tvůj profil</b>',
-            line=dict(color='#F59E0B', width=3, smoothing=1.3),  # Amber s vyhlazením
-            fillcolor='rgba(245, 158, 11, 0.2)',
-            marker=dict(size=8, color='#D97706')
-        ))
-        fig_radar.add_trace(go.Scatterpolar(
-            r=[overall["delta_valence"],overall["delta_arousal"],overall["First reaction time"]],
-            theta=radar_categories, 
-            fill='toself', 
-            name='<b>Průměr skupiny</b>',
-            line=dict(color='#6366F1', width=2.5, dash='dot', smoothing=1.3),  # Indigo s tečkami
-            fillcolor='rgba(99, 102, 241, 0.15)',
-            marker=dict(size=6, color='#4F46E5')
-        ))
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    gridcolor='rgba(156, 163, 175, 0.4)',
-                    linecolor='rgba(156, 163, 175, 0.6)',
-                    tickfont=dict(size=10, color='#6B7280')
-                ),
-                angularaxis=dict(
-                    gridcolor='rgba(156, 163, 175, 0.4)',
-                    linecolor='rgba(156, 163, 175, 0.6)',
-                    tickfont=dict(size=12, color='#374151', family="Inter, system-ui, sans-serif")
-                ),
-                bgcolor='rgba(249, 250, 251, 0.5)'
-            ), 
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.1,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=12, color='#374151', family="Inter, system-ui, sans-serif"),
-                bgcolor="rgba(255, 255, 255, 0.8)",
-                bordercolor="rgba(229, 231, 235, 1)",
-                borderwidth=1
-            ),
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(color='#111827', size=12, family="Inter, system-ui, sans-serif"),
-            title=dict(
-                text="<b>Tvůj emoční radar</b>",
-                font=dict(size=18, color='#111827', family="Inter, system-ui, sans-serif"),
-                x=0.5,
-                pad=dict(t=20, b=20)
-            ),
-            margin=dict(l=60, r=60, t=80, b=80),
-            height=500
-        )
-
-        # Boxploty - moderní design s gradientem
-        import numpy as np
-        
-        # Boxplot pro valenci - moderní design s gradientním pozadím
-        fig_hist_val = go.Figure()
-        
-        # Přidání boxplotu populace - elegantní moderní styl
-        fig_hist_val.add_trace(go.Box(
-            y=deltas_all["delta_valence"],
-            name="Všichni účastníci",
-            boxpoints=False,
-            fillcolor='rgba(99, 102, 241, 0.15)',  # Indigo s transparentností
-            line=dict(color='#6366F1', width=2.5),
-            marker=dict(color='#6366F1', size=6),
-            whiskerwidth=0.8,
-            boxmean=True  # Zobrazí průměr
-        ))
-        
-        # Přidání tvé hodnoty jako stylový bod
-        fig_hist_val.add_trace(go.Scatter(
-            x=["Všichni účastníci"],
-            y=[user_val],
-            mode="markers",
-            name="Tvá hodnota",
-            marker=dict(
-                color='#F59E0B',  # Moderní amber
-                size=16,
-                symbol="diamond",
-                line=dict(color='#D97706', width=2.5),
-                opacity=0.9
-            )
-        ))
-        
-        # Výpočet percentilu pro interpretaci
-        val_percentile = (deltas_all["delta_valence"] < user_val).mean() * 100
-        val_interpretation = f"Tvoje hodnocení bylo pozitivnější než u {val_percentile:.0f}% účastníků" if user_val > 0 else f"Tvoje hodnocení bylo negativnější než u {100-val_percentile:.0f}% účastníků"
-        
-        fig_hist_val.update_layout(
-            title=dict(
-                text=f"<b>Jak vnímáš příjemnost slov oproti ostatním</b><br><span style='color:#6B7280; font-size:13px'>{val_interpretation}</span>",
-                font=dict(size=16, color='#111827', family="Inter, system-ui, sans-serif"),
-                x=0.3,
-                pad=dict(t=20, b=20)
-            ),
-            yaxis_title="<b>Lateralita</b> (nepříjemné ← 0 → příjemné)",
-            yaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.3)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=1.5
-            ),
-            xaxis_title="",
-            xaxis=dict(
-                tickfont=dict(size=12, color='#374151', family="Inter, system-ui, sans-serif"),
-                showgrid=False
-            ),
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=11, color='#374151')
-            ),
-            plot_bgcolor='rgba(249, 250, 251, 1)',
-            paper_bgcolor='white',
-            font=dict(color='#111827', family="Inter, system-ui, sans-serif"),
-            margin=dict(l=60, r=20, t=120, b=40),
-            height=450,
-            annotations=[
-                dict(
-                    x=0, y=user_val,
-                    text=f"<b>Ty: {user_val:.2f}</b>",
-                    showarrow=True,
-                    arrowhead=2,
-                    arrowcolor="#F59E0B",
-                    arrowwidth=2,
-                    ax=70, ay=-10,
-                    font=dict(color='#D97706', size=12, family="Inter, system-ui, sans-serif"),
-                    bgcolor="rgba(255, 255, 255, 0.9)",
-                    bordercolor="#F59E0B",
-                    borderwidth=1
-                )
-            ]
-        )
-
-        # Boxplot pro arousal - elegantní fialový design 
-        fig_hist_ar = go.Figure()
-        
-        # Přidání boxplotu populace - moderní fialový styl
-        fig_hist_ar.add_trace(go.Box(
-            y=deltas_all["delta_arousal"],
-            name="Všichni účastníci",
-            boxpoints=False,
-            fillcolor='rgba(139, 92, 246, 0.15)',  # Violet s transparentností
-            line=dict(color='#8B5CF6', width=2.5),
-            marker=dict(color='#8B5CF6', size=6),
-            whiskerwidth=0.8,
-            boxmean=True  # Zobrazí průměr
-        ))
-        
-        # Přidání tvé hodnoty - sladění s amber barvou
-        fig_hist_ar.add_trace(go.Scatter(
-            x=["Všichni účastníci"],
-            y=[user_ar],
-            mode="markers",
-            name="Tvá hodnota",
-            marker=dict(
-                color='#F59E0B',  # Stejná amber jako u valence
-                size=16,
-                symbol="diamond",
-                line=dict(color='#D97706', width=2.5),
-                opacity=0.9
-            )
-        ))
-        
-        # Výpočet percentilu pro interpretaci
-        ar_percentile = (deltas_all["delta_arousal"] < user_ar).mean() * 100
-        ar_interpretation = f"Tvé reakce byly intenzivnější než u {ar_percentile:.0f}% účastníků" if user_ar > 0 else f"Tvé reakce byly klidnější než u {100-ar_percentile:.0f}% účastníků"
-        
-        fig_hist_ar.update_layout(
-            title=dict(
-                text=f"<b>Jak intenzivně reaguješ na slova oproti ostatním</b><br><span style='color:#6B7280; font-size:13px'>{ar_interpretation}</span>",
-                font=dict(size=16, color='#111827', family="Inter, system-ui, sans-serif"),
-                x=0.3,
-                pad=dict(t=20, b=20)
-            ),
-            yaxis_title="<b>Valence</b> (slabá ← 0 → silná emoční reakce)",
-            yaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.3)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=1.5
-            ),
-            xaxis_title="",
-            xaxis=dict(
-                tickfont=dict(size=12, color='#374151', family="Inter, system-ui, sans-serif"),
-                showgrid=False
-            ),
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=11, color='#374151')
-            ),
-            plot_bgcolor='rgba(249, 250, 251, 1)',
-            paper_bgcolor='white',
-            font=dict(color='#111827', family="Inter, system-ui, sans-serif"),
-            margin=dict(l=60, r=20, t=120, b=40),
-            height=450,
-            annotations=[
-                dict(
-                    x=0, y=user_ar,
-                    text=f"<b>Ty: {user_ar:.2f}</b>",
-                    showarrow=True,
-                    arrowhead=2,
-                    arrowcolor="#F59E0B",
-                    arrowwidth=2,
-                    ax=70, ay=-10,
-                    font=dict(color='#D97706', size=12, family="Inter, system-ui, sans-serif"),
-                    bgcolor="rgba(255, 255, 255, 0.9)",
-                    bordercolor="#F59E0B",
-                    borderwidth=1
-                )
-            ]
-        )
-
-        # Scatter (bubliny) - elegantní moderní design s podmíněným barvením
-        # Vytvoříme sloupec pro barvu na základě extrémních reakčních časů
-        sub_with_colors = sub.copy()
-        rt_q75 = sub["First reaction time"].quantile(0.75)
-        rt_q25 = sub["First reaction time"].quantile(0.25)
-        iqr = rt_q75 - rt_q25
-        extreme_threshold_high = rt_q75 + 1.5 * iqr
-        extreme_threshold_low = rt_q25 - 1.5 * iqr
-        
-        # Přiřadíme barvy: hnědá pro unikátní časy, emerald pro běžné
-        sub_with_colors["color_category"] = sub_with_colors["First reaction time"].apply(
-            lambda x: "Unikátní" if (x > extreme_threshold_high or x < extreme_threshold_low) else "Běžný"
-        )
-        
-        fig_scatter = px.scatter(
-            sub_with_colors, x="delta_arousal", y="delta_valence",
-            size="First reaction time",
-            color="color_category",
-            hover_data={"Term":True,"delta_arousal":":.2f","delta_valence":":.2f","First reaction time":":.2f"},
-            labels={"delta_arousal":"Valence (silná emoční reakce)","delta_valence":"Lateralita (příjemnost)","First reaction time":"Reakční doba (s)"},
-            title="<b>Tvá slova v emočním prostoru</b>",
-            color_discrete_map={
-                "Běžný": "#10B981",  # Emerald zelená
-                "Unikátní": "#D2B48C"   # Světle hnědá
-            }
-        )
-        
-        # Přidání gradientního pozadí a vylepšení stylu
-        fig_scatter.update_traces(
-            marker=dict(
-                line=dict(width=1.5, color='white'),
-                opacity=0.8,
-                sizemin=8,
-                sizeref=0.3
-            ),
-            hovertemplate="<b>%{customdata[0]}</b><br>" +
-                        "Valence: %{x:.2f}<br>" +
-                        "Lateralita: %{y:.2f}<br>" +
-                        "Reakční doba: %{marker.size:.2f}s<extra></extra>"
-        )
-        
-        fig_scatter.update_layout(
-            title=dict(
-                font=dict(size=18, color='#111827', family="Inter, system-ui, sans-serif"),
-                x=0.5,
-                pad=dict(t=20, b=20)
-            ),
-            xaxis_title="<b>Valence</b> (slabá ← → silná emoční reakce)",
-            yaxis_title="<b>Lateralita</b> (nepříjemné ← → příjemné)",
-            xaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.3)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=2,
-                showline=True,
-                linecolor='#E5E7EB'
-            ),
-            yaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.3)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=2,
-                showline=True,
-                linecolor='#E5E7EB'
-            ),
-            plot_bgcolor='rgba(249, 250, 251, 1)',
-            paper_bgcolor='white',
-            font=dict(color='#111827', family="Inter, system-ui, sans-serif"),
-            margin=dict(l=60, r=40, t=80, b=60),
-            height=500,
-            legend=dict(
-                title_text="",  # Odstraní název nad legendou
-                font=dict(color='#000000', size=12, family="Inter, system-ui, sans-serif")  # Černý text legendy
-            ),
-            # Přidání subtilního gradientu do pozadí
-            shapes=[
-                dict(
-                    type="rect",
-                    xref="paper", yref="paper",
-                    x0=0, y0=0, x1=1, y1=1,
-                    fillcolor="rgba(249, 250, 251, 0.8)",
-                    layer="below",
-                    line_width=0,
-                )
-            ]
-        )
-
-        # Kontury - elegantní heatmapa s moderním designem
-        fig_contour = px.density_contour(
-            deltas_all, x="delta_arousal", y="delta_valence",
-            labels={"delta_arousal":"Valence (silná emoční reakce)","delta_valence":"Lateralita (příjemnost)"},
-            title="<b>Emoční mapa skupiny + tvá slova</b>",
-        )
-        
-        # Moderní color scheme - použijeme elegantní blue-purple gradient
-        fig_contour.update_traces(
-            contours_coloring="fill", 
-            contours_showlabels=False,  # Skryjeme labely pro čistší vzhled
-            colorscale=[
-                [0.0, "rgba(99, 102, 241, 0.1)"],      # Velmi světlý indigo
-                [0.2, "rgba(99, 102, 241, 0.3)"],      # Světlý indigo
-                [0.4, "rgba(139, 92, 246, 0.5)"],      # Středně fialová
-                [0.6, "rgba(168, 85, 247, 0.7)"],      # Tmavší fialová
-                [0.8, "rgba(147, 51, 234, 0.8)"],      # Fialová
-                [1.0, "rgba(126, 34, 206, 0.9)"]       # Nejintenzivnější fialová
-            ],
-            showscale=True,
-            colorbar=dict(
-                title=dict(
-                    text="<b>Hustota účastníků</b><br><span style='font-size:11px'>nízká → vysoká</span>",
-                    font=dict(color='#374151', size=12, family="Inter, system-ui, sans-serif")
-                ),
-                tickfont=dict(color='#6B7280', size=10),
-                thickness=12,
-                len=0.7,
-                x=1.02
-            ),
-            line=dict(width=0.5, color='rgba(255, 255, 255, 0.3)')  # Jemné bílé okraje
-        )
-        
-        fig_contour.update_layout(
-            title=dict(
-                font=dict(size=18, color='#111827', family="Inter, system-ui, sans-serif"),
-                x=0.5,
-                pad=dict(t=20, b=20)
-            ),
-            xaxis_title="<b>Valence</b> (slabá ← → silná emoční reakce)",
-            yaxis_title="<b>Lateralita</b> (nepříjemné ← → příjemné)",
-            xaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.2)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=2,
-                showline=True,
-                linecolor='#E5E7EB'
-            ),
-            yaxis=dict(
-                title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                tickfont=dict(size=11, color='#6B7280'),
-                gridcolor='rgba(156, 163, 175, 0.2)',
-                zerolinecolor='#9CA3AF',
-                zerolinewidth=2,
-                showline=True,
-                linecolor='#E5E7EB'
-            ),
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(color='#111827', family="Inter, system-ui, sans-serif"),
-            margin=dict(l=60, r=100, t=80, b=60),
-            height=550
-        )
-        
-        # Přidání tvých slov jako elegantní body
-        fig_contour.add_scatter(
-            x=sub["delta_arousal"], y=sub["delta_valence"], 
-            mode="markers+text",
-            text=sub["Term"], 
-            textposition="top center",
-            marker=dict(
-                color="white",  # Bílé body pro maximální kontrast
-                size=12, 
-                opacity=1,
-                symbol="circle",
-                line=dict(color="#F59E0B", width=3)  # Amber okraj
-            ), 
-            name="<b>Tvá slova</b>",
-            textfont=dict(
-                color='#111827', 
-                size=10, 
-                family="Inter, system-ui, sans-serif",
-                weight="bold"
-            ),
-            hovertemplate="<b>%{text}</b><br>" +
-                        "Δ arousal: %{x:.2f}<br>" +
-                        "Δ valence: %{y:.2f}<extra></extra>"
-        )
-
-        # Line chart (pokud je Order) - elegantní moderní design
-        fig_line = None
-        if "Order" in sub.columns:
-            srt = sub.sort_values("Order")
-            fig_line = px.line(srt, x="Order", y="First reaction time", markers=True,
-                            labels={"Order":"Pořadí","First reaction time":"Reakční doba (s)"},
-                            title="<b>Jak se měnila tvoje reakční doba během úkolu</b>",
-                            color_discrete_sequence=["#10B981"])  # Elegantní emerald
-            
-            # Aplikace pokročilého moderního stylu
-            fig_line.update_traces(
-                line=dict(width=3, color="#10B981", smoothing=1.3),
-                marker=dict(
-                    size=8, 
-                    color="#059669", 
-                    line=dict(width=2, color="white"),
-                    symbol="circle"
-                ),
-                hovertemplate="<b>Pořadí:</b> %{x}<br><b>Reakční doba:</b> %{y:.2f}s<extra></extra>"
-            )
-            
-            fig_line.update_layout(
-                plot_bgcolor="white",
-                paper_bgcolor="white", 
-                font=dict(family="Inter, system-ui, sans-serif", size=12, color="#111827"),
-                title=dict(
-                    font=dict(size=18, color="#111827", family="Inter, system-ui, sans-serif"), 
-                    x=0.5,
-                    pad=dict(t=20, b=20)
-                ),
-                xaxis=dict(
-                    title="<b>Pořadí hodnocení</b>",
-                    title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                    tickfont=dict(size=11, color='#6B7280'),
-                    showgrid=True, 
-                    gridcolor="rgba(156, 163, 175, 0.3)",
-                    showline=True,
-                    linecolor="#E5E7EB",
-                    linewidth=1
-                ),
-                yaxis=dict(
-                    title="<b>Reakční doba (sekundy)</b>",
-                    title_font=dict(size=13, color='#374151', family="Inter, system-ui, sans-serif"),
-                    tickfont=dict(size=11, color='#6B7280'),
-                    showgrid=True, 
-                    gridcolor="rgba(156, 163, 175, 0.3)",
-                    showline=True,
-                    linecolor="#E5E7EB",
-                    linewidth=1
-                ),
-                hovermode="x unified",
-                margin=dict(l=60, r=20, t=80, b=60),
-                height=400,
-                # Přidání jemného gradientního pozadí
-                shapes=[
-                    dict(
-                        type="rect",
-                        xref="paper", yref="paper",
-                        x0=0, y0=0, x1=1, y1=1,
-                        fillcolor="rgba(249, 250, 251, 0.5)",
-                        layer="below",
-                        line_width=0,
-                    )
-                ]
-            )
+        figs = build_figures(str(selected_id), version)
 
         log_user_activity(selected_id, "charts_created", "Všechny grafy úspěšně vytvořeny")
         
@@ -687,15 +834,7 @@ def main():
             - Popište, co jste dělali před chybou
             """)
         
-        if st.checkbox("🔧 Zobrazit technické detaily"):
-            st.code(f"ID: {selected_id}")
-            st.code(f"Chyba: {type(e).__name__}: {e}")
-            st.code(f"Čas: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-        # Přidáme tlačítko pro restart
-        if st.button("🔄 Zkusit znovu"):
-            st.rerun()
-            
+        render_error_details(selected_id, f"{type(e).__name__}: {e}", time.strftime('%Y-%m-%d %H:%M:%S'))
         st.stop()
 
     # -----------------------------
@@ -704,48 +843,25 @@ def main():
     try:
         insights = []
         
-        # Lateralita (X-osa)
-        if user_val > overall["delta_valence"] + 0.1:
-            insights.append("Celkově vnímáš slova **příjemnějšími** než většina účastníků.")
-        elif user_val < overall["delta_valence"] - 0.1:
-            insights.append("Celkově vnímáš slova **nepříjemnějšími** než většina účastníků.")
-        else:
-            insights.append("Tvoje vnímání příjemnosti slov je **podobné** většině účastníků.")
-
-        # Valence (Z-osa)
-        if user_ar > overall["delta_arousal"] + 0.1:
-            insights.append("Slova v tobě vyvolávala **silnější emoční odezvu** než u ostatních.")
-        elif user_ar < overall["delta_arousal"] - 0.1:
-            insights.append("Reaguješ spíše **klidněji** (mírnější emoční intenzita) než většina.")
-        else:
-            insights.append("Intenzita prožívání je **blízko průměru** skupiny.")
-
-        # Reakční doba
-        overall_rt = overall["First reaction time"]
-        if pd.notna(user_rt) and pd.notna(overall_rt):
-            if user_rt < overall_rt - 0.2:
-                insights.append("Rozhoduješ se **rychleji** než je průměr skupiny.")
-            elif user_rt > overall_rt + 0.2:
-                insights.append("Rozhoduješ se **pomaleji** než je průměr skupiny.")
-            else:
-                insights.append("Tvoje reakční doba je **srovnatelná** se skupinou.")
-
-        # Dominance
-        if user_dom > overall["Pos Y"] + 0.1:
-            insights.append("V průměru se cítíš **více dominantně** (silnější pocit kontroly) než většina.")
-        elif user_dom < overall["Pos Y"] - 0.1:
-            insights.append("V průměru se cítíš **méně dominantně** než většina.")
-        else:
-            insights.append("Pocit kontroly (dominance) je **blízko průměru**.")
-
-        # TOP 3 nejodlišnější slova
-        sub["abs_dev"] = sub["delta_valence"].abs() + sub["delta_arousal"].abs()
-        top3 = sub.sort_values("abs_dev", ascending=False).head(3)[["Term","delta_valence","delta_arousal"]]
-        
-        if not top3.empty:
+        user_means = {"delta_valence": user_val, "delta_arousal": user_ar,
+                      "First reaction time": user_rt, "Pos Y": user_dom}
+        levels = insight_levels([user_means[col] for col in INSIGHT_COLS],
+                                [overall[col] for col in INSIGHT_COLS], INSIGHT_TOL)
+        for (col, tol, above, below, near), level in zip(INSIGHT_RULES, levels):
+            if np.isnan(level):
+                continue
+            insights.append(above if level > 0 else below if level < 0 else near)
+
+        # TOP 3 nejodlišnější slova – argpartition místo řazení celého rámce
+        absdev = np.abs(sub[["delta_valence","delta_arousal"]].to_numpy()).sum(axis=1)
+        k = min(3, absdev.size)
+        if k:
+            idx = np.argpartition(-absdev, k - 1)[:k]
+            idx = idx[np.argsort(-absdev[idx])]
+            top3 = sub.iloc[idx]
             msg = "Nejosobitější slova: " + "; ".join(
-                f"{r.Term} (Lateralita {r.delta_valence:+.2f}, Valence {r.delta_arousal:+.2f})"
-                for r in top3.itertuples()
+                f"{term} (Lateralita {dv:+.2f}, Valence {da:+.2f})"
+                for term, dv, da in top3[["Term","delta_valence","delta_arousal"]].itertuples(index=False, name=None)
             )
             insights.append(msg)
 
@@ -758,55 +874,20 @@ def main():
         insight_text = "• Nepodařilo se vygenerovat osobní insighty."
 
     # -----------------------------
-    # Připrav PDF
+    # Kvalitativní analýza – jednou pro PDF i sekci s citáty
     # -----------------------------
+    user_analysis, matching_quotes, qualitative_pdf_text, qualitative_insights = None, [], "", ""
+    qualitative_error = None
     try:
-        figs = {
-            "radar":    fig_radar,
-            "hist_val": fig_hist_val,
-            "hist_ar":  fig_hist_ar,
-            "scatter":  fig_scatter,
-            "contour":  fig_contour
-        }
-        if fig_line is not None:
-            figs["line_rt"] = fig_line
-
-        summary_text = (
-            "Shrnutí tvých výsledků v emočním mapování:\n\n"
-            f"Hodnotil(a) jsi {words_n} slov na třech dimenzích:\n"
-            "• Valence (X-osa): jak příjemné/nepříjemné slovo vnímáš\n"
-            "• Arousal (Z-osa): jak aktivující/uklidňující slovo na tebe působí\n" 
-            "• Dominance (Y-osa): jakou míru kontroly u slova cítíš\n\n"
-            f"Tvoje průměrná reakční doba: {user_rt:.2f} sekund\n"
-            f"Celkový počet hodnocených slov: {words_n}\n\n"
-            "Delta metriky (Δ) ukazují, o kolik se tvoje hodnocení lišila od průměru populace. "
-            "Pozitivní hodnoty = vyšší hodnocení než průměr, negativní = nižší než průměr."
-        )
-        
-        # Přidej kvalitativní analýzu pro PDF
-        qualitative_pdf_text = ""
-        try:
-            thematic_df = load_thematic_data()
-            if not thematic_df.empty:
-                user_analysis = analyze_user_strategy(sub, deltas_all)
-                qualitative_pdf_text = generate_qualitative_insights(user_analysis, [])
-        except:
-            qualitative_pdf_text = ""
-        
-        pdf_bytes = build_pdf_report(selected_id, summary_text, insight_text, figs, qualitative_pdf_text)
-        log_user_activity(selected_id, "pdf_generated", "PDF report úspěšně vygenerován")
-        
+        user_analysis, matching_quotes, qualitative_pdf_text, qualitative_insights = get_qualitative(str(selected_id), version)
     except Exception as e:
-        logger.error(f"Chyba při generování PDF pro {selected_id}: {e}")
-        st.error("⚠️ **Varování:** Nepodařilo se vygenerovat PDF report.")
-        pdf_bytes = None
+        logger.error(f"Chyba při kvalitativní analýze pro {selected_id}: {e}")
+        qualitative_error = e
 
     # -----------------------------
-    # PDF tlačítko
+    # PDF tlačítko – PDF se generuje až na vyžádání (export grafů do PNG je nejdražší krok)
     # -----------------------------
-    if pdf_bytes:
-        st.download_button("📄 Stáhnout osobní PDF report", data=pdf_bytes,
-                        file_name=f"{selected_id}_emocni_profil.pdf", mime="application/pdf")
+    render_pdf_section(str(selected_id), insight_text, qualitative_pdf_text, version)
     
     st.divider()
 
@@ -815,33 +896,33 @@ def main():
     # -----------------------------
     st.subheader("📊 Srovnání s ostatními účastníky (radar graf)")
     st.caption("**Co ukazuje:** Tvé průměrné hodnoty (modré) vs. průměr všech účastníků (oranžové).  \n**Jak číst:** Větší překryv = podobnější jsi většině; větší rozdíly = unikátnější přístup.")
-    st.plotly_chart(fig_radar, use_container_width=True)
+    st.plotly_chart(figs["radar"], use_container_width=True, config=STATIC_CHART_CONFIG)
 
     left,right = st.columns(2)
     with left:
         st.subheader("Jak vnímáš příjemnost slov")
         st.caption("**Co ukazuje:** Krabička = rozsah, ve kterém se nacházela většina účastníků. Červený diamant = tvá pozice.  \n**Jak číst:** Jsi-li uvnitř krabičky = typický. Mimo krabičku = máš výrazně odlišný styl hodnocení příjemnosti slov!")
-        st.plotly_chart(fig_hist_val, use_container_width=True)
+        st.plotly_chart(figs["hist_val"], use_container_width=True, config=STATIC_CHART_CONFIG)
     with right:
         st.subheader("Jak vnímáš intenzitu emocí") 
         st.caption("**Co ukazuje:** Krabička = rozsah většiny účastníků. Červený diamant = ty.  \n**Jak číst:** Nad krabičkou = reaguješ intenzivněji než většina. Pod krabičkou = reaguješ klidněji. V krabičce = jsi typický!")
-        st.plotly_chart(fig_hist_ar, use_container_width=True)
+        st.plotly_chart(figs["hist_ar"], use_container_width=True, config=STATIC_CHART_CONFIG)
 
     st.subheader("Mapa tvých slov")
     st.caption("**Co ukazuje:** Každý bod = jedno slovo, které jsi hodnotil. Větší bublina = delší čas rozhodování.  \n**Jak číst:** Pozice ukazuje, jak jsi slovo umístil. Najetím myší uvidíš detaily.")
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    st.plotly_chart(figs["scatter"], use_container_width=True)
 
     st.subheader("Emoční ‚heatmapa' skupiny + tvá slova")
     st.caption("**Co ukazuje:** Barevné plochy znázorňují, kde se soustředila většina hodnocení ostatních účastníků. Tmavé body s textem = tvá slova.  \n**Jak číst:** Pokud jsou tvá slova v tmavých oblastech, hodnotíš podobně jako většina. V světlých oblastech = máš unikátní přístup!")
-    st.plotly_chart(fig_contour, use_container_width=True)
+    st.plotly_chart(figs["contour"], use_container_width=True)
 
-    if fig_line is not None:
+    if "line_rt" in figs:
         st.subheader("Vývoj reakční doby")
         st.caption("**Co to je:** Jak se měnila tvoje rychlost během úkolu.  \n**Jak číst:** Trend dolů = zrychlování; trend nahoru = zpomalování.")
-        st.plotly_chart(fig_line, use_container_width=True)
+        st.plotly_chart(figs["line_rt"], use_container_width=True)
 
     # -----------------------------
-    # Osobní insighty a druhé PDF tlačítko
+    # Osobní insighty
     # -----------------------------
     st.divider()
     st.subheader("🔍 Tvé osobní insighty")
@@ -855,39 +936,29 @@ def main():
     st.caption("**Na základě rozhovorů:** Porovnání tvé strategie s tím, jak o úkolu mluvili ostatní účastníci.")
     
     try:
-        # Načti tématická data
-        thematic_df = load_thematic_data()
-        
-        if not thematic_df.empty:
-            # Analyzuj uživatelovu strategii
-            user_analysis = analyze_user_strategy(sub, deltas_all)
-            
-            # Najdi relevantní citáty
-            matching_quotes = get_matching_quotes(user_analysis, thematic_df)
-            
-            # Generuj qualitativní insights
-            qualitative_insights = generate_qualitative_insights(user_analysis, matching_quotes)
-            
+        # Chyba výpočtu výše se hlásí jako chyba, ne jako chybějící data
+        if qualitative_error is not None:
+            st.error("⚠️ Nepodařilo se načíst kvalitativní srovnání.")
+        elif user_analysis is not None:
+            # Qualitativní insights, analýza i citáty jsou spočítané výše (cache per ID)
             # Zobraz analýzu
-            st.markdown("**🎯 Tvá strategie hodnocení:**")
-            st.markdown(qualitative_insights)
+            st.markdown(f"**🎯 Tvá strategie hodnocení:**\n\n{qualitative_insights}")
             
             if matching_quotes:
                 st.markdown("**💭 Podobné přístupy jiných účastníků:**")
                 
                 for i, quote_data in enumerate(matching_quotes, 1):
                     with st.expander(f"📝 {quote_data['theme']}", expanded=(i==1)):
-                        st.markdown(f"**Co to znamená:** {quote_data['definition']}")
-                        
                         # Odstraň kód účastníka z citátu (například "(PCM023)")
                         clean_quote = quote_data['quote']
-                        import re
                         # Odstraň text v závorkách na konci citátu typu (PCM123), (PCZ456) atd.
                         clean_quote = re.sub(r'\s*\([A-Z]{3}\d{3}\)\s*$', '', clean_quote).strip()
                         # Odstraň i jiné varianty s kódy
                         clean_quote = re.sub(r'\s*\([A-Z]+\d+\)\s*$', '', clean_quote).strip()
                         
-                        st.markdown(f"**Citát od účastníka:** _{clean_quote}_")
+                        # Definice i citát jedním st.markdown → jeden element místo dvou
+                        st.markdown(f"**Co to znamená:** {quote_data['definition']}\n\n"
+                                    f"**Citát od účastníka:** _{clean_quote}_")
                         
                 log_user_activity(selected_id, "qualitative_analysis", f"Zobrazeno {len(matching_quotes)} citátů")
             else:
@@ -900,10 +971,6 @@ def main():
         logger.error(f"Chyba při kvalitativní analýze pro {selected_id}: {e}")
         st.error("⚠️ Nepodařilo se načíst kvalitativní srovnání.")
 
-    if pdf_bytes:
-        st.download_button("📄 Stáhnout PDF report (znovu)", data=pdf_bytes,
-                        file_name=f"{selected_id}_emocni_profil.pdf", mime="application/pdf")
-
     st.divider()
     st.markdown("---")
     st.markdown("**🔒 Ochrana soukromí:** Tento report je určen pouze pro tebe. Obsahuje pouze tvá data a anonymizované skupinové průměry pro srovnání.")
@@ -83,21 +83,9 @@ HELP_TEXT_INTRO = """
 """
 
 # -----------------------------
-# 1) Načítání dat (pouze z /data složky)
+# 1) Načítání dat (pouze z /data složky) – jen přes cachovaný loader
 # -----------------------------
-try:
-    vybrana = pd.read_csv(DATA_DIR / "vybrana_slova_30.csv")
-    hand = pd.read_csv(DATA_DIR / "hand_dataset.csv", sep=";", engine="python")
-except FileNotFoundError as e:
-    st.error(f"Chyba při načítání dat: {e}")
-    st.error("Ujistěte se, že jsou v složce 'data' soubory: vybrana_slova_30.csv a hand_dataset.csv")
-    st.stop()
-
-users = None
-if (DATA_DIR / "users.csv").exists():
-    users = pd.read_csv(DATA_DIR / "users.csv")
-
-hand = standardize_hand_columns(hand)
+vybrana, hand, users = load_and_process_data()
 
 # -----------------------------
 # 2) Validace dat
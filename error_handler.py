@@ -1,10 +1,18 @@
 # error_handler.py
 import streamlit as st
 import pandas as pd
+import importlib.util
 import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
 from typing import Optional, Tuple, Any
 import traceback
 
+# pyarrow je volitelný – vícevláknový CSV parser, bez něj padáme zpět na C engine
+# (stačí zjistit dostupnost, modul si pandas importuje sám)
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
 # Nastavení loggingu
 logging.basicConfig(
     level=logging.INFO,
@@ -24,10 +32,30 @@ class UserNotFoundError(Exception):
     """Vlastní výjimka pro nenalezení uživatele"""
     pass
 
-def safe_read_csv(file_path: str, sep: str = ",", **kwargs) -> Optional[pd.DataFrame]:
-    """Bezpečné načítání CSV souborů s error handlingem"""
+def safe_read_csv(file_path: str, sep: str = ",", engine: Optional[str] = None,
+                  chunksize: Optional[int] = None, transform=None, **kwargs) -> Optional[pd.DataFrame]:
+    """Bezpečné načítání CSV souborů s error handlingem (engine="pyarrow" jen pokud je nainstalován,
+    při jeho selhání se soubor načte C parserem).
+
+    S chunksize se soubor čte po blocích a transform (např. přetypování na float32) se aplikuje
+    na každý blok hned po načtení → ve špičce je v paměti jen jeden surový blok."""
+    if engine == "pyarrow" and (not HAS_PYARROW or chunksize):
+        engine = None  # pyarrow parser čtení po blocích nepodporuje
     try:
-        df = pd.read_csv(file_path, sep=sep, **kwargs)
+        if chunksize:
+            with pd.read_csv(file_path, sep=sep, engine=engine, chunksize=chunksize, **kwargs) as reader:
+                df = pd.concat([transform(c) if transform else c for c in reader], ignore_index=True)
+        else:
+            try:
+                df = pd.read_csv(file_path, sep=sep, engine=engine, **kwargs)
+            except ValueError as e:
+                if engine != "pyarrow" or isinstance(e, pd.errors.EmptyDataError):
+                    raise
+                # pyarrow nepodporuje všechny volby/formáty → druhý pokus C parserem
+                logger.warning(f"pyarrow parser selhal u {file_path} ({e}), zkouším C engine")
+                df = pd.read_csv(file_path, sep=sep, **kwargs)
+            if transform:
+                df = transform(df)
         logger.info(f"Úspěšně načten soubor: {file_path}, tvar: {df.shape}")
         return df
     except FileNotFoundError:
@@ -70,23 +98,31 @@ def validate_data_structure(df: pd.DataFrame, required_columns: list, data_name:
         st.error(f"🚫 **Chyba validace {data_name}:** {e}")
         return False
 
-def safe_numeric_conversion(df: pd.DataFrame, numeric_columns: list) -> pd.DataFrame:
-    """Bezpečná konverze sloupců na numerické hodnoty"""
+def safe_numeric_conversion(df: pd.DataFrame, numeric_columns: list, dtype=None) -> pd.DataFrame:
+    """Bezpečná konverze sloupců na numerické hodnoty (volitelně na zadaný dtype, např. float32)"""
     try:
         for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-                nan_count = df[col].isna().sum()
-                if nan_count > 0:
-                    logger.warning(f"Konverze {col}: {nan_count} hodnot převedeno na NaN")
+            if col not in df.columns:
+                continue
+            if pd.api.types.is_numeric_dtype(df[col]):
+                # Už numerický sloupec (např. z pyarrow parseru) – bez to_numeric, jen případné přetypování
+                if dtype is not None and df[col].dtype != dtype:
+                    df[col] = df[col].astype(dtype)
+                continue
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+            if dtype is not None:
+                df[col] = df[col].astype(dtype)
+            nan_count = df[col].isna().sum()
+            if nan_count > 0:
+                logger.warning(f"Konverze {col}: {nan_count} hodnot převedeno na NaN")
         return df
     except Exception as e:
         logger.error(f"Chyba při konverzi numerických hodnot: {e}")
         st.warning(f"⚠️ **Varování:** Některé numerické hodnoty se nepodařilo převést: {e}")
         return df
 
-def validate_user_id(user_id: str, available_ids: list) -> bool:
-    """Validace uživatelského ID"""
+def validate_user_id(user_id: str, available_ids) -> bool:
+    """Validace uživatelského ID (available_ids ideálně frozenset – kontrola v O(1))"""
     try:
         if not user_id:
             logger.error("ID uživatele je prázdné")
@@ -101,7 +137,9 @@ def validate_user_id(user_id: str, available_ids: list) -> bool:
             st.markdown("**❓ Nemáte svůj odkaz?** Kontaktujte organizátory studie.")
             return False
             
-        if str(user_id) not in [str(id) for id in available_ids]:
+        if not isinstance(available_ids, (set, frozenset)):
+            available_ids = {str(id) for id in available_ids}
+        if str(user_id) not in available_ids:
             logger.error(f"Neplatné ID uživatele: {user_id}")
             st.error(f"🚫 **ID '{user_id}' nebylo nalezeno**")
             st.error("**Možné příčiny:**")
@@ -125,33 +163,65 @@ def validate_user_id(user_id: str, available_ids: list) -> bool:
         st.error(f"🚫 **Chyba validace ID:** {e}")
         return False
 
+@contextmanager
+def streamlit_guard(name: str = "aplikace"):
+    """Globální error handling jako context manager – `with streamlit_guard(): ...` i pro kód mimo funkci"""
+    try:
+        yield
+    except UserNotFoundError as e:
+        logger.error(f"Uživatel nenalezen: {e}")
+        st.error(f"🚫 **Uživatel nenalezen:** {e}")
+        st.stop()
+    except DataValidationError as e:
+        logger.error(f"Chyba validace dat: {e}")
+        st.error(f"🚫 **Chyba dat:** {e}")
+        st.stop()
+    except Exception as e:
+        logger.error(f"Neočekávaná chyba v {name}: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        st.error("🚫 **Nastala neočekávaná chyba**")
+        st.error("Kontaktujte prosím podporu s následujícími detaily:")
+        st.code(f"Chyba: {type(e).__name__}: {e}")
+        if st.checkbox("Zobrazit technické detaily"):
+            st.code(traceback.format_exc())
+        st.stop()
+
 def handle_exception(func):
-    """Dekorátor pro globální error handling"""
+    """Dekorátor pro globální error handling (tenká obálka nad streamlit_guard)"""
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        try:
+        with streamlit_guard(func.__name__):
             return func(*args, **kwargs)
-        except UserNotFoundError as e:
-            logger.error(f"Uživatel nenalezen: {e}")
-            st.error(f"🚫 **Uživatel nenalezen:** {e}")
-            st.stop()
-        except DataValidationError as e:
-            logger.error(f"Chyba validace dat: {e}")
-            st.error(f"🚫 **Chyba dat:** {e}")
-            st.stop()
-        except Exception as e:
-            logger.error(f"Neočekávaná chyba v {func.__name__}: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            st.error("🚫 **Nastala neočekávaná chyba**")
-            st.error("Kontaktujte prosím podporu s následujícími detaily:")
-            st.code(f"Chyba: {type(e).__name__}: {e}")
-            if st.checkbox("Zobrazit technické detaily"):
-                st.code(traceback.format_exc())
-            st.stop()
     return wrapper
 
+# Aktivity odložené během jednoho běhu stránky (viz batch_user_activity); ContextVar je per vlákno/session
+_activity_batch: ContextVar[Optional[list]] = ContextVar("activity_batch", default=None)
+
 def log_user_activity(user_id: str, action: str, details: str = ""):
-    """Logování aktivit uživatelů"""
+    """Logování aktivit uživatelů (uvnitř batch_user_activity se jen odloží)"""
+    batch = _activity_batch.get()
+    if batch is not None:
+        batch.append((user_id, action, details))
+        return
     try:
         logger.info(f"USER_ACTIVITY - ID: {user_id}, Action: {action}, Details: {details}")
     except Exception as e:
         logger.error(f"Chyba při logování aktivity: {e}")
+
+def batch_user_activity(func):
+    """Dekorátor: aktivity zalogované během volání zapíše až na konci (i po st.stop)"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        batch = []
+        token = _activity_batch.set(batch)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _activity_batch.reset(token)
+            # Každá aktivita jako samostatný jednořádkový záznam – čas doplní formatter, grep nad app.log funguje
+            for user_id, action, details in batch:
+                try:
+                    logger.info(f"USER_ACTIVITY - ID: {user_id}, Action: {action}, Details: {details}")
+                except Exception as e:
+                    logger.error(f"Chyba při logování aktivity: {e}")
+    return wrapper
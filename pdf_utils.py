@@ -4,8 +4,10 @@ from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfbase.ttfonts import TTFont
 import os
+import tempfile
 
 # Registrace fontů pro podporu českých znaků
 def register_fonts():
@@ -76,7 +78,6 @@ def fig_to_png_bytes(fig, scale=2):
                 return buf.getvalue()
 
 def draw_wrapped_text(c, text, x, y, max_width=480, leading=14, font="DejaVu", size=10):
-    from reportlab.pdfbase.pdfmetrics import stringWidth
     
     # Bezpečné nastavení fontu s fallback
     try:
@@ -130,8 +131,35 @@ def draw_wrapped_text(c, text, x, y, max_width=480, leading=14, font="DejaVu", s
         y -= leading
     return y
 
+def render_pngs(figs, scale=2):
+    """Převede grafy na PNG – dávkově přes plotly.io.write_images (kaleido >= 1 spustí Chromium
+    jen jednou pro všechny grafy), jinak postupně po jednom grafu.
+
+    Vlákna nepomáhají: kaleido 0.2 exportuje pod jedním zámkem a kaleido >= 1 by pro každé
+    volání spouštělo vlastní Chromium.
+    """
+    if not figs:
+        return {}
+    try:
+        from plotly.io import write_images
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f"{i}.png") for i in range(len(figs))]
+            write_images(list(figs.values()), paths, format="png", scale=scale)
+            pngs = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    pngs.append(f.read())
+        return dict(zip(figs, pngs))
+    except Exception:
+        # Starší plotly/kaleido nebo chyba dávky → osvědčený export po jednom s fallbacky
+        return {name: fig_to_png_bytes(fig, scale=scale) for name, fig in figs.items()}
+
 def build_pdf_report(selected_id, summary_text, insight_text, figs, qualitative_text=""):
     """figs = dict(name->plotly_figure) pro vložení do PDF."""
+    return build_pdf_report_from_pngs(selected_id, summary_text, insight_text, render_pngs(figs), qualitative_text)
+
+def build_pdf_report_from_pngs(selected_id, summary_text, insight_text, pngs, qualitative_text=""):
+    """pngs = dict(name->PNG bytes) s předrenderovanými grafy."""
     
     # Registrujeme fonty pro podporu českých znaků
     font_name = register_fonts()
@@ -185,8 +213,8 @@ Vaše hodnocení emocí ve slovech bylo zmapováno do třídimenzionálního pro
         c.setFont("Helvetica", 10)
     c.drawString(50, h-80, "Poloha v emočním prostoru: Valence (X), Arousal (Z), Dominance (Y)")
     
-    if "radar" in figs:
-        png = fig_to_png_bytes(figs["radar"], scale=2)
+    if "radar" in pngs:
+        png = pngs["radar"]
         c.drawImage(ImageReader(BytesIO(png)), 40, h-360, width=520, height=280, preserveAspectRatio=True, mask='auto')
     
     try:
@@ -201,11 +229,11 @@ Vaše hodnocení emocí ve slovech bylo zmapováno do třídimenzionálního pro
         c.setFont("Helvetica", 10)
     c.drawString(50, h-405, "Krabička = většina lidí, červený diamant = ty")
     
-    if "hist_val" in figs:
-        png = fig_to_png_bytes(figs["hist_val"], scale=2)
+    if "hist_val" in pngs:
+        png = pngs["hist_val"]
         c.drawImage(ImageReader(BytesIO(png)), 40, h-680, width=250, height=280, preserveAspectRatio=True, mask='auto')
-    if "hist_ar" in figs:
-        png = fig_to_png_bytes(figs["hist_ar"], scale=2)
+    if "hist_ar" in pngs:
+        png = pngs["hist_ar"]
         c.drawImage(ImageReader(BytesIO(png)), 310, h-680, width=250, height=280, preserveAspectRatio=True, mask='auto')
     c.showPage()
 
@@ -222,8 +250,8 @@ Vaše hodnocení emocí ve slovech bylo zmapováno do třídimenzionálního pro
         c.setFont("Helvetica", 10)
     c.drawString(50, h-80, "Pozice jednotlivých slov v emočním prostoru (velikost = reakční doba)")
     
-    if "scatter" in figs:
-        png = fig_to_png_bytes(figs["scatter"], scale=2)
+    if "scatter" in pngs:
+        png = pngs["scatter"]
         c.drawImage(ImageReader(BytesIO(png)), 40, h-360, width=520, height=280, preserveAspectRatio=True, mask='auto')
     
     try:
@@ -238,8 +266,8 @@ Vaše hodnocení emocí ve slovech bylo zmapováno do třídimenzionálního pro
         c.setFont("Helvetica", 10)
     c.drawString(50, h-405, "Teplé oblasti = vyšší koncentrace tvých hodnocení")
     
-    if "contour" in figs:
-        png = fig_to_png_bytes(figs["contour"], scale=2)
+    if "contour" in pngs:
+        png = pngs["contour"]
         c.drawImage(ImageReader(BytesIO(png)), 40, h-680, width=520, height=260, preserveAspectRatio=True, mask='auto')
     c.showPage()
 
@@ -274,8 +302,8 @@ Vaše hodnocení emocí ve slovech bylo zmapováno do třídimenzionálního pro
         c.setFont("Helvetica", 10)
     c.drawString(50, line_y-15, "Změny rychlosti odpovědí v průběhu hodnocení slov")
     
-    if "line_rt" in figs:
-        png = fig_to_png_bytes(figs["line_rt"], scale=2)
+    if "line_rt" in pngs:
+        png = pngs["line_rt"]
         chart_y = line_y-300 if qualitative_text else h-620
         c.drawImage(ImageReader(BytesIO(png)), 40, chart_y, width=520, height=260, preserveAspectRatio=True, mask='auto')
         
@@ -1,5 +1,6 @@
 # test_app.py
 import unittest
+import logging
 import pandas as pd
 import numpy as np
 from unittest.mock import patch, MagicMock
@@ -9,8 +10,12 @@ import os
 # Přidej current directory do sys.path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from utils import standardize_hand_columns, compute_deltas, MAP_AROUSAL, MAP_VALENCE
-from error_handler import validate_data_structure, safe_numeric_conversion, validate_user_id
+from utils import standardize_hand_columns, compute_deltas, lttb_indices, insight_levels, box_stats, MAP_AROUSAL, MAP_VALENCE
+from error_handler import (
+    validate_data_structure, safe_numeric_conversion, validate_user_id, safe_read_csv,
+    log_user_activity, batch_user_activity, streamlit_guard, handle_exception, DataValidationError
+)
+import accessibility
 
 class TestUtils(unittest.TestCase):
     """Testy pro utils.py funkce"""
@@ -65,6 +70,60 @@ class TestUtils(unittest.TestCase):
         neg_row = result[result['Term'] == 'negativní'].iloc[0]
         self.assertEqual(neg_row['baseline_valence'], -1)  # negativní = -1
         self.assertAlmostEqual(neg_row['delta_valence'], 0.7, places=2)
+    
+    def test_compute_deltas_keeps_float32(self):
+        """Test, že float32 souřadnice dají float32 delty (bez převodu zpět na float64)"""
+        hand = self.sample_hand_data.astype({'Pos X': 'float32', 'Pos Z': 'float32'})
+        result = compute_deltas(hand, self.sample_baseline_data)
+        self.assertEqual(result['delta_valence'].dtype, np.float32)
+        self.assertEqual(result['delta_arousal'].dtype, np.float32)
+    
+    def test_compute_deltas_keeps_string_dtype(self):
+        """Test, že Term zůstane string dtype i při rozdílném dtype baseline slov"""
+        hand = self.sample_hand_data.astype({'Term': 'string'})
+        result = compute_deltas(hand, self.sample_baseline_data.astype({'Word': object}))
+        self.assertEqual(result['Term'].dtype, hand['Term'].dtype)
+    
+    def test_compute_deltas_integer_coordinates(self):
+        """Test, že celočíselné souřadnice a slovo bez baseline dají NaN deltu, ne výjimku"""
+        hand = self.sample_hand_data.assign(**{'Pos X': [1, -1], 'Pos Z': [2, 0], 'Term': ['pozitivní', 'neznámé']})
+        result = compute_deltas(hand, self.sample_baseline_data)
+        self.assertEqual(result['delta_valence'].iloc[0], 0.0)
+        self.assertEqual(result['delta_arousal'].iloc[0], -1.0)
+        self.assertTrue(np.isnan(result['delta_valence'].iloc[1]))
+        self.assertTrue(np.isnan(result['delta_arousal'].iloc[1]))
+    
+    def test_insight_levels(self):
+        """Test vektorového porovnání s průměrem skupiny"""
+        levels = insight_levels([0.5, -0.5, 0.05, np.nan], [0.0, 0.0, 0.0, 0.0], np.array([0.1, 0.1, 0.1, 0.1]))
+        self.assertEqual(levels[:3].tolist(), [1, -1, 0])
+        self.assertTrue(np.isnan(levels[3]))
+        
+        # Dávka více uživatelů najednou
+        batch = insight_levels([[0.5, 0.0], [-0.5, 0.3]], [0.0, 0.0], np.array([0.1, 0.2]))
+        self.assertEqual(batch.tolist(), [[1, 0], [-1, 1]])
+    
+    def test_box_stats(self):
+        """Test předpočítaných statistik boxplotu"""
+        stats = box_stats([4.0, 1.0, np.nan, 3.0, 2.0])
+        self.assertEqual(stats['median'], [2.5])
+        self.assertEqual(stats['q1'], [1.5])
+        self.assertEqual(stats['q3'], [3.5])
+        self.assertEqual((stats['lowerfence'], stats['upperfence'], stats['mean']), ([1.0], [4.0], [2.5]))
+    
+    def test_lttb_indices(self):
+        """Test LTTB downsamplingu"""
+        x = np.arange(5000)
+        y = np.sin(x / 50.0)
+        y[1234] = 10.0  # výrazný extrém musí downsampling přežít
+        idx = lttb_indices(x, y, 500)
+        self.assertEqual(len(idx), 500)
+        self.assertEqual(idx[0], 0)
+        self.assertEqual(idx[-1], 4999)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertIn(1234, idx)
+        # Krátká série zůstane beze změny
+        np.testing.assert_array_equal(lttb_indices(x[:100], y[:100], 500), np.arange(100))
 
 class TestErrorHandler(unittest.TestCase):
     """Testy pro error_handler.py funkce"""
@@ -96,17 +155,85 @@ class TestErrorHandler(unittest.TestCase):
         self.assertEqual(result['Value'].iloc[1], 2.0)
         self.assertTrue(pd.isna(result['Value'].iloc[2]))
     
+    def test_safe_numeric_conversion_float32(self):
+        """Test konverze na float32"""
+        result = safe_numeric_conversion(self.sample_df.copy(), ['Value'], dtype='float32')
+        self.assertEqual(result['Value'].dtype, np.float32)
+        self.assertTrue(pd.isna(result['Value'].iloc[2]))
+        
+        # Už numerický sloupec se jen přetypuje
+        numeric = safe_numeric_conversion(pd.DataFrame({'Value': [1.0, np.nan]}), ['Value'], dtype='float32')
+        self.assertEqual(numeric['Value'].dtype, np.float32)
+    
+    def test_safe_read_csv_chunked(self):
+        """Test čtení po blocích se stejným výsledkem jako čtení najednou"""
+        import tempfile
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("ID;Value\n" + "".join(f"U{i};{i}.5\n" for i in range(7)))
+        try:
+            to32 = lambda df: safe_numeric_conversion(df, ['Value'], dtype='float32')
+            whole = safe_read_csv(f.name, sep=";", transform=to32)
+            chunked = safe_read_csv(f.name, sep=";", engine="pyarrow", chunksize=3, transform=to32)
+            pd.testing.assert_frame_equal(whole, chunked)
+            self.assertEqual(chunked['Value'].dtype, np.float32)
+        finally:
+            os.unlink(f.name)
+    
+    def test_safe_read_csv_pyarrow_fallback(self):
+        """Test, že volba nepodporovaná pyarrow parserem spadne zpět na C engine"""
+        import tempfile
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("ID;Value\nU1;1,500\n")
+        try:
+            df = safe_read_csv(f.name, sep=";", engine="pyarrow", thousands=",")
+            self.assertEqual(df['Value'].iloc[0], 1500)
+        finally:
+            os.unlink(f.name)
+    
     def test_validate_user_id_success(self):
         """Test úspěšné validace user ID"""
         with patch('streamlit.error'), patch('streamlit.info'):
             result = validate_user_id('TEST001', ['TEST001', 'TEST002', 'TEST003'])
             self.assertTrue(result)
+            self.assertTrue(validate_user_id('TEST002', frozenset({'TEST001', 'TEST002'})))
     
     def test_validate_user_id_failure(self):
         """Test neúspěšné validace user ID"""
         with patch('streamlit.error'), patch('streamlit.info'):
             result = validate_user_id('INVALID', ['TEST001', 'TEST002'])
             self.assertFalse(result)
+    
+    def test_streamlit_guard(self):
+        """Test, že guard i dekorátor zachytí chybu a zastaví stránku"""
+        with patch('streamlit.error') as mock_error, patch('streamlit.stop') as mock_stop:
+            with streamlit_guard():
+                raise DataValidationError("chybí sloupec")
+            mock_error.assert_called_once()
+            mock_stop.assert_called_once()
+            
+            @handle_exception
+            def page():
+                raise DataValidationError("chybí sloupec")
+            page()
+            self.assertEqual(mock_stop.call_count, 2)
+            self.assertEqual(page.__name__, 'page')
+    
+    def test_batch_user_activity(self):
+        """Test odloženého logování aktivit – záznamy až na konci volání, každý na jednom řádku"""
+        @batch_user_activity
+        def page():
+            log_user_activity('TEST001', 'page_access')
+            with patch.object(logging.getLogger('error_handler'), 'info') as mock_info:
+                log_user_activity('TEST001', 'report_completed')
+            mock_info.assert_not_called()
+        
+        with self.assertLogs('error_handler', level='INFO') as logs:
+            page()
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('page_access', logs.output[0])
+        self.assertIn('report_completed', logs.output[1])
+        self.assertTrue(all('\n' not in r.getMessage() for r in logs.records))
+        self.assertEqual(page.__name__, 'page')
 
 class TestDataIntegrity(unittest.TestCase):
     """Testy integrity a kvality dat"""
@@ -131,6 +258,155 @@ class TestDataIntegrity(unittest.TestCase):
         valence_values = set(MAP_VALENCE.values())
         self.assertEqual(valence_values, {-1, 0, 1})
 
+class TestAccessibility(unittest.TestCase):
+    """Testy pro accessibility.py"""
+    
+    def test_css_is_minified(self):
+        """Test, že minifikované CSS neobsahuje komentáře ani zalomení řádků"""
+        css = accessibility._CSS
+        self.assertTrue(css.startswith("<style>"))
+        self.assertTrue(css.endswith("</style>"))
+        self.assertNotIn("/*", css)
+        self.assertNotIn("\n", css)
+        self.assertIn(".sr-only", css)
+        self.assertLess(len(css), len(accessibility._RAW_CSS))
+    
+    def test_metric_cards_single_markdown_call(self):
+        """Test, že více metric cards se vykreslí jedním voláním st.markdown"""
+        cards = [("Slova", 30), ("Valence", "0.12", "+0.05"), ("Arousal", "-0.40", None, "nápověda")]
+        with patch('streamlit.markdown') as mock_markdown:
+            accessibility.create_accessible_metric_cards(cards)
+        self.assertEqual(mock_markdown.call_count, 1)
+        html = mock_markdown.call_args[0][0]
+        self.assertTrue(html.startswith('<div class="metric-grid">'))
+        self.assertEqual(html.count('class="metric-container"'), 3)
+        self.assertIn('aria-label="Valence: 0.12 (+0.05)"', html)
+        self.assertIn('<div class="sr-only">nápověda</div>', html)
+    
+    def test_buffered_output_single_flush(self):
+        """Test, že odložené fragmenty se vykreslí jedním st.markdown voláním"""
+        import plotly.graph_objects as go
+        with patch('streamlit.session_state', {}), patch('streamlit.markdown') as mock_markdown:
+            accessibility.create_accessible_metric_card("A", 1, buffered=True)
+            accessibility.create_accessible_metric_card("B", 2, buffered=True)
+            accessibility.make_chart_accessible(go.Figure(), "Graf", "Popis", buffered=True)
+            self.assertEqual(mock_markdown.call_count, 0)
+            accessibility.flush_accessibility_buffer()
+            accessibility.flush_accessibility_buffer()
+        self.assertEqual(mock_markdown.call_count, 1)
+        self.assertEqual(mock_markdown.call_args[0][0].count('class="metric-container"'), 2)
+    
+    def test_buffer_reset_on_new_run(self):
+        """Test, že fragmenty z přerušeného běhu se v dalším běhu nevykreslí znovu"""
+        with patch('streamlit.session_state', {}), patch('streamlit.html'), \
+                patch('streamlit.markdown') as mock_markdown:
+            accessibility.create_accessible_metric_card("A", 1, buffered=True)
+            # Další běh – předchozí skončil (např. st.stop) bez flush
+            accessibility.add_accessibility_features()
+            accessibility.create_accessible_metric_card("B", 2, buffered=True)
+            accessibility.flush_accessibility_buffer()
+        html = mock_markdown.call_args[0][0]
+        self.assertEqual(html.count('class="metric-container"'), 1)
+        self.assertIn('B: 2', html)
+    
+    def test_html_escaping(self):
+        """Test, že uživatelské texty jsou escapované"""
+        import html
+        text = 'Slova <b>"test"</b> & \'další\''
+        self.assertEqual(accessibility._esc(text), html.escape(text))
+        card = accessibility._card_html('A "B"', '<1>')
+        self.assertNotIn('"B"', card)
+        self.assertNotIn('<1>', card)
+        self.assertIn('&lt;1&gt;', card)
+    
+    def test_make_chart_accessible_data_summary(self):
+        """Test výpočtu textového shrnutí dat grafu"""
+        import plotly.graph_objects as go
+        fig = go.Figure(go.Box(y=[1.0, 2.0, 6.0]))
+        with patch('streamlit.markdown') as mock_markdown:
+            accessibility.make_chart_accessible(fig, "Test", "Popis", data=[1.0, 2.0, np.nan, 6.0])
+        self.assertEqual(fig._a11y_summary, "min 1.00, max 6.00, průměr 3.00, n=3")
+        self.assertIn(fig._a11y_summary, mock_markdown.call_args[0][0])
+    
+    def test_make_chart_accessible_empty_data(self):
+        """Test, že prázdná nebo celá NaN data nevytvoří shrnutí ani výjimku"""
+        import plotly.graph_objects as go
+        for data in ([], [np.nan, np.nan]):
+            fig = go.Figure()
+            with patch('streamlit.markdown') as mock_markdown:
+                accessibility.make_chart_accessible(fig, "Test", "Popis", data=data)
+            self.assertFalse(hasattr(fig, '_a11y_summary'))
+            self.assertNotIn('min', mock_markdown.call_args[0][0])
+    
+    def test_downsample_only_line_traces(self):
+        """Test, že LTTB zmenší jen čárové traces se seřazeným x"""
+        import plotly.graph_objects as go
+        x = np.arange(5000.0)
+        fig = go.Figure([
+            go.Scatter(x=x, y=np.sin(x), mode='lines'),
+            go.Scatter(x=x, y=np.sin(x), mode='markers'),
+            go.Scatter(x=x[::-1], y=np.sin(x), mode='lines'),
+            go.Scatter(x=x, y=['a'] * 5000, mode='lines'),
+        ])
+        accessibility._downsample_traces(fig, 500)
+        self.assertEqual([len(tr.x) for tr in fig.data], [500, 5000, 5000, 5000])
+    
+    def test_downsample_slices_point_arrays(self):
+        """Test, že chybové úsečky i další per-point pole zůstanou zarovnané s body"""
+        import plotly.graph_objects as go
+        x = np.arange(5000.0)
+        fig = go.Figure(go.Scatter(x=x, y=np.sin(x), mode='lines', error_y=dict(array=x / 10),
+                                   ids=[str(i) for i in range(5000)], marker=dict(symbol=['circle'] * 5000)))
+        accessibility._downsample_traces(fig, 500)
+        tr = fig.data[0]
+        self.assertEqual(len(tr.error_y.array), 500)
+        np.testing.assert_allclose(tr.error_y.array, np.asarray(tr.x) / 10)
+        self.assertEqual(list(tr.ids), [str(int(v)) for v in tr.x])
+        self.assertEqual(len(tr.marker.symbol), 500)
+    
+    def test_downsample_keeps_datetime_axis(self):
+        """Test, že LTTB u časové osy vrátí původní datetime hodnoty, ne epoch floaty"""
+        import plotly.graph_objects as go
+        dates = pd.date_range("2024-01-01", periods=5000, freq="min")
+        fig = go.Figure(go.Scatter(x=dates, y=np.sin(np.arange(5000.0)), mode='lines'))
+        accessibility._downsample_traces(fig, 500)
+        self.assertEqual(len(fig.data[0].x), 500)
+        self.assertEqual(fig.data[0].x.dtype.kind, 'M')
+        self.assertEqual(pd.Timestamp(fig.data[0].x[0]), dates[0])
+    
+    def test_make_chart_accessible_keeps_template(self):
+        """Test, že a11y šablona se vrství na vlastní šablonu grafu"""
+        import plotly.graph_objects as go
+        fig = go.Figure(layout_template='plotly_dark')
+        accessibility.make_chart_accessible(fig, "Test", "")
+        layout = fig.layout.template.layout
+        self.assertEqual(layout.paper_bgcolor, 'rgb(17,17,17)')
+        self.assertEqual(layout.colorway, accessibility._COLORWAY)
+        self.assertEqual(layout.title.x, 0.5)
+        self.assertEqual(fig.layout.title.text, "Test")
+    
+    def test_make_chart_accessible_webgl_upgrade(self):
+        """Test, že automaticky se převedou jen velké scatter traces na Scattergl"""
+        import plotly.graph_objects as go
+        fig = go.Figure([
+            go.Scatter(x=np.arange(2000), y=np.random.normal(0, 1, 2000), name='velký'),
+            go.Scatter(x=[1, 2], y=[3, 4], name='malý'),
+        ])
+        with patch('streamlit.markdown'):
+            accessibility.make_chart_accessible(fig, "Test", "Popis")
+        self.assertEqual([tr.type for tr in fig.data], ['scattergl', 'scatter'])
+        self.assertIsNone(fig.layout.meta)
+    
+    def test_webgl_upgrade_skips_unsupported_properties(self):
+        """Test, že trace s vlastností, kterou Scattergl nepodporuje, zůstane SVG a zaloguje se"""
+        import plotly.graph_objects as go
+        fig = go.Figure(go.Scatter(x=np.arange(2000), y=np.zeros(2000), line=dict(shape='spline', smoothing=1.2)))
+        with self.assertLogs('accessibility', level='INFO') as logs:
+            accessibility._upgrade_to_webgl(fig)
+        self.assertEqual(fig.data[0].type, 'scatter')
+        self.assertEqual(fig.data[0].line.smoothing, 1.2)
+        self.assertIn('scattergl.line', logs.output[0])
+
 class TestPerformance(unittest.TestCase):
     """Testy výkonu aplikace"""
     
@@ -165,7 +441,7 @@ class TestPerformance(unittest.TestCase):
 def run_tests():
     """Spuštění všech testů"""
     # Vytvoření test suite
-    test_classes = [TestUtils, TestErrorHandler, TestDataIntegrity, TestPerformance]
+    test_classes = [TestUtils, TestErrorHandler, TestDataIntegrity, TestAccessibility, TestPerformance]
     
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
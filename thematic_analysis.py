@@ -1,8 +1,10 @@
 # thematic_analysis.py
 import pandas as pd
 import numpy as np
+import streamlit as st
 from typing import List, Dict, Tuple
 
+@st.cache_data(ttl=3600)
 def load_thematic_data():
     """Načte tématický codebook"""
     try:
@@ -110,11 +112,11 @@ def get_matching_quotes(analysis: Dict, thematic_df: pd.DataFrame) -> List[Dict[
     # Najdi citáty pro relevantní kódy
     for code in relevant_codes:
         matches = thematic_df[thematic_df['Code'] == code]
-        for _, row in matches.iterrows():
+        for theme, definition, quote in matches[['Subtheme', 'Definition', 'Example quotes']].itertuples(index=False, name=None):
             matching_quotes.append({
-                'theme': row['Subtheme'],
-                'definition': row['Definition'], 
-                'quote': row['Example quotes'],
+                'theme': theme,
+                'definition': definition, 
+                'quote': quote,
                 'code': code
             })
     
@@ -1,4 +1,5 @@
 # utils.py
+import numpy as np
 import pandas as pd
 
 # Převod baseline štítků → čísla
@@ -47,12 +48,54 @@ def compute_deltas(hand_df: pd.DataFrame, vybrana: pd.DataFrame) -> pd.DataFrame
     """Výpočet delt dle konvence: X=Valence, Z=Arousal, Y=Dominance (bez baseline)."""
     word_col = _detect_word_col(vybrana)
     v = vybrana.rename(columns={word_col: "Word"})
+    # Klíče joinu ve stejném (Arrow) string dtype – jinak merge spadne na object sloupce
+    v["Word"] = v["Word"].astype(hand_df["Term"].dtype)
 
     merged = hand_df.merge(v, left_on="Term", right_on="Word", how="left")
-    merged["baseline_arousal"] = merged["Arousal"].map(MAP_AROUSAL)
-    merged["baseline_valence"] = merged["Valence"].map(MAP_VALENCE)
+    # baseline ve float dtype souřadnic, aby delty zůstaly float32; celočíselné souřadnice
+    # → float64 (slovo bez baseline dává NaN, které se do int nevejde)
+    merged["baseline_arousal"] = merged["Arousal"].map(MAP_AROUSAL).astype(np.result_type(merged["Pos Z"].dtype, np.float32))
+    merged["baseline_valence"] = merged["Valence"].map(MAP_VALENCE).astype(np.result_type(merged["Pos X"].dtype, np.float32))
 
-    merged["delta_valence"] = merged["Pos X"] - merged["baseline_valence"]
-    merged["delta_arousal"]  = merged["Pos Z"] - merged["baseline_arousal"]
+    # Přímo nad numpy poli – bez zarovnávání indexů v pandas
+    merged["delta_valence"] = merged["Pos X"].to_numpy() - merged["baseline_valence"].to_numpy()
+    merged["delta_arousal"]  = merged["Pos Z"].to_numpy() - merged["baseline_arousal"].to_numpy()
     # dominance (Pos Y) porovnáváme jen vůči skupině → žádné delta_dominance
     return merged
+
+def insight_levels(user, group, tol) -> np.ndarray:
+    """Porovnání s průměrem skupiny: 1 = nad, -1 = pod, 0 = v toleranci, NaN = chybí hodnota.
+       Funguje pro jednoho uživatele (k metrik) i pro dávku (N × k) najednou."""
+    diff = np.asarray(user, dtype=np.float64) - np.asarray(group, dtype=np.float64)
+    return np.sign(diff) * (np.abs(diff) > tol)
+
+def box_stats(values) -> dict:
+    """Předpočítané statistiky pro go.Box (q1, median, q3, fences, mean) místo surových hodnot.
+       Kvartily počítá stejně jako plotly.js (Hazen); fences = min/max jako u boxpoints=False."""
+    v = np.asarray(values, dtype=np.float64)
+    q1, med, q3 = np.nanpercentile(v, [25, 50, 75], method="hazen")
+    return dict(q1=[q1], median=[med], q3=[q3],
+                lowerfence=[np.nanmin(v)], upperfence=[np.nanmax(v)], mean=[np.nanmean(v)])
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indexy n_out bodů, které nejlépe zachovají tvar křivky.
+       První a poslední bod zůstávají vždy zachovány."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Vnitřní body rozdělíme do n_out-2 bucketů, z každého vybereme jeden
+    buckets = np.array_split(np.arange(1, n - 1), n_out - 2)
+    idx = np.empty(n_out, dtype=np.intp)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i, b in enumerate(buckets):
+        nxt = buckets[i + 1] if i + 1 < len(buckets) else np.array([n - 1])
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        # Plocha trojúhelníku (předchozí vybraný bod, kandidát, průměr dalšího bucketu)
+        area = np.abs((x[a] - cx) * (y[b] - y[a]) - (x[a] - x[b]) * (cy - y[a]))
+        a = b[np.argmax(area)]
+        idx[i + 1] = a
+    return idx